@@ -1,12 +1,54 @@
 CREATE EXTENSION IF NOT EXISTS vector;
 
+-- One row per session; last_accessed_at drives the TTL reaper
+CREATE TABLE sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_accessed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    -- Set when the reaper claims the session; a claimed session is never touched again
+    reaping_at TIMESTAMPTZ
+);
+
+CREATE INDEX sessions_last_accessed_at_idx ON sessions (last_accessed_at);
+
+-- Hash-partitioned by session: every query filters on session_id, so it is pruned to
+-- one partition, and deleting a session only touches that partition and its indexes
 CREATE TABLE documents (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     content TEXT NOT NULL,
     chunk_id INTEGER NOT NULL,
     tag TEXT NOT NULL,
     video_id TEXT,
     uri TEXT,
     session_id TEXT NOT NULL,
-    embedding vector(384)
+    embedding vector(384),
+    embedding_half halfvec(384),  -- used instead of embedding when EMBEDDING_STORAGE=halfvec
+    PRIMARY KEY (session_id, id)
+) PARTITION BY HASH (session_id);
+
+DO $$
+BEGIN
+    FOR i IN 0..15 LOOP
+        EXECUTE format(
+            'CREATE TABLE documents_p%s PARTITION OF documents FOR VALUES WITH (MODULUS 16, REMAINDER %s)', i, i
+        );
+    END LOOP;
+END $$;
+
+CREATE INDEX documents_session_tag_idx ON documents (session_id, tag);
+
+-- Binary-quantized prefilter for EMBEDDING_STORAGE=halfvec (one bit per dimension)
+CREATE INDEX documents_embedding_half_bit_idx ON documents
+    USING hnsw ((binary_quantize(embedding_half)::bit(384)) bit_hamming_ops);
+
+-- Progress of /store/stream uploads, advanced in the same transaction as each window
+CREATE TABLE store_streams (
+    stream_id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    committed_records INTEGER NOT NULL DEFAULT 0,
+    completed BOOLEAN NOT NULL DEFAULT false,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
+
+CREATE INDEX store_streams_session_id_idx ON store_streams (session_id);
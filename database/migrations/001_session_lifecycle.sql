@@ -0,0 +1,58 @@
+-- Moves an existing database to the layout in init.sql: a sessions table and a
+-- documents table hash-partitioned by session_id. Run once with psql:
+--
+--   psql "$DSN" -v ON_ERROR_STOP=1 -f database/migrations/001_session_lifecycle.sql
+--
+-- The copy runs in one transaction and blocks writes to documents while it runs.
+-- documents_unpartitioned is kept for verification; drop it afterwards.
+
+BEGIN;
+
+CREATE TABLE sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_accessed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX sessions_last_accessed_at_idx ON sessions (last_accessed_at);
+
+ALTER TABLE documents RENAME TO documents_unpartitioned;
+ALTER SEQUENCE documents_id_seq RENAME TO documents_unpartitioned_id_seq;
+ALTER INDEX documents_pkey RENAME TO documents_unpartitioned_pkey;
+
+CREATE TABLE documents (
+    id SERIAL,
+    content TEXT NOT NULL,
+    chunk_id INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    video_id TEXT,
+    uri TEXT,
+    session_id TEXT NOT NULL,
+    embedding vector(384),
+    PRIMARY KEY (session_id, id)
+) PARTITION BY HASH (session_id);
+
+DO $$
+BEGIN
+    FOR i IN 0..15 LOOP
+        EXECUTE format(
+            'CREATE TABLE documents_p%s PARTITION OF documents FOR VALUES WITH (MODULUS 16, REMAINDER %s)', i, i
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO documents (id, content, chunk_id, tag, video_id, uri, session_id, embedding)
+SELECT id, content, chunk_id, tag, video_id, uri, session_id, embedding FROM documents_unpartitioned;
+
+SELECT setval('documents_id_seq', COALESCE((SELECT max(id) FROM documents), 0) + 1, false);
+
+CREATE INDEX documents_session_tag_idx ON documents (session_id, tag);
+
+-- Existing sessions start their TTL now
+INSERT INTO sessions (session_id)
+SELECT DISTINCT session_id FROM documents
+ON CONFLICT DO NOTHING;
+
+COMMIT;
+
+ANALYZE documents;
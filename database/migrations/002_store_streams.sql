@@ -0,0 +1,14 @@
+-- Adds the progress table used by DBService's /store/stream. Run once with psql:
+--
+--   psql "$DSN" -v ON_ERROR_STOP=1 -f database/migrations/002_store_streams.sql
+
+CREATE TABLE store_streams (
+    stream_id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    committed_records INTEGER NOT NULL DEFAULT 0,
+    completed BOOLEAN NOT NULL DEFAULT false,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX store_streams_session_id_idx ON store_streams (session_id);
@@ -0,0 +1,56 @@
+-- Adds half-precision embeddings and the binary-quantized prefilter index used by
+-- EMBEDDING_STORAGE=halfvec, and backfills them from the existing vector column.
+-- Needs pgvector >= 0.8: DBService sets hnsw.iterative_scan for halfvec searches, and
+-- the script stops if the installed version is older. Run with psql, outside a
+-- transaction (the backfill commits every batch so it never holds locks on the whole
+-- table):
+--
+--   psql "$DSN" -v ON_ERROR_STOP=1 -f database/migrations/003_compact_embeddings.sql
+--
+-- Switching an existing deployment:
+--   1. run this script,
+--   2. set EMBEDDING_STORAGE=halfvec on every DBService instance,
+--   3. run this script again to backfill rows written in between (it is idempotent),
+--   4. reclaim the space of the full-precision vectors:
+--        ALTER TABLE documents DROP COLUMN embedding;
+--      then VACUUM FULL each documents_p* partition in a maintenance window.
+
+DO $$
+BEGIN
+    IF string_to_array((SELECT extversion FROM pg_extension WHERE extname = 'vector'), '.')::int[] < ARRAY[0, 8] THEN
+        RAISE EXCEPTION 'EMBEDDING_STORAGE=halfvec needs pgvector >= 0.8';
+    END IF;
+END $$;
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS embedding_half halfvec(384);
+
+-- Walks the primary key in order, 10000 rows per batch, so every batch is an index range
+-- scan that starts where the previous one stopped.
+DO $$
+DECLARE
+    last_session text := '';
+    last_id integer := 0;
+BEGIN
+    LOOP
+        WITH batch AS (
+            SELECT session_id, id FROM documents
+            WHERE (session_id, id) > (last_session, last_id)
+            ORDER BY session_id, id
+            LIMIT 10000
+        ), backfilled AS (
+            UPDATE documents d SET embedding_half = d.embedding::halfvec(384)
+            FROM batch b
+            WHERE d.session_id = b.session_id AND d.id = b.id
+              AND d.embedding_half IS NULL AND d.embedding IS NOT NULL
+        )
+        SELECT session_id, id INTO last_session, last_id
+        FROM batch ORDER BY session_id DESC, id DESC LIMIT 1;
+        EXIT WHEN NOT FOUND;
+        COMMIT;
+    END LOOP;
+END $$;
+
+CREATE INDEX IF NOT EXISTS documents_embedding_half_bit_idx ON documents
+    USING hnsw ((binary_quantize(embedding_half)::bit(384)) bit_hamming_ops);
+
+ANALYZE documents;
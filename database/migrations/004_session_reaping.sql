@@ -0,0 +1,5 @@
+-- Adds the reaper's claim marker to sessions (see DBService/sessions.py). Run once with psql:
+--
+--   psql "$DSN" -v ON_ERROR_STOP=1 -f database/migrations/004_session_reaping.sql
+
+ALTER TABLE sessions ADD COLUMN reaping_at TIMESTAMPTZ;
@@ -3,6 +3,7 @@ import logging
 import requests
 import uvicorn
 import json
+import asyncio
 import boto3
 import uuid
 from dotenv import load_dotenv
@@ -14,8 +15,15 @@ from fastapi import UploadFile, File
 from botocore.exceptions import ClientError
 from fastapi import APIRouter, HTTPException
 from botocore.exceptions import ClientError 
+
+from common.observability import instrument_app, stage, outgoing_headers, merge_server_timing
+from common.logging_config import configure_logging, truncate
+from s3_manifest import SessionManifestCache, StoredObjects, list_session_objects, manifest_metadata
+import s3_uploads
+import session_reaper
+
 # Setup logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+configure_logging("backend")
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -31,6 +39,13 @@ s3_client = boto3.client(
 DB_SERVICE_URL = os.getenv("DB_SERVICE_URL", "http://localhost:8003")
 LLM_PROMPT_SERVICE_URL = os.getenv("LLM_PROMPT_SERVICE_URL", "http://localhost:8002")
 EXTRACTOR_SERVICE_URL = os.getenv("EXTRACTOR_SERVICE_URL", "http://localhost:8001")
+MANIFEST_TTL_SECONDS = float(os.getenv("MANIFEST_TTL_SECONDS", "300"))
+SESSION_REAPER_INTERVAL = float(os.getenv("SESSION_REAPER_INTERVAL", "3600"))  # 0 disables the background reaper
+SESSION_REAP_BATCH = int(os.getenv("SESSION_REAP_BATCH", "100"))
+STORE_STREAM_RETRIES = int(os.getenv("STORE_STREAM_RETRIES", "2"))
+
+manifest_cache = SessionManifestCache(ttl_seconds=MANIFEST_TTL_SECONDS)
+stored_objects = StoredObjects()
 
 # FastAPI app
 app = FastAPI()
@@ -42,7 +57,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Request-ID", "Server-Timing"],  # Let the frontend read the timing breakdown
 )
+instrument_app(app, "backend")
+
 class StoreRequest(BaseModel):
     session_id: str
     tag: str
@@ -50,21 +68,109 @@ class StoreRequest(BaseModel):
 class UploadRequest(BaseModel):
     session_id: str
     filenames: List[str]
+class MultipartStartRequest(BaseModel):
+    session_id: str
+    filename: str
+    size: int
+    part_size: Optional[int] = None
+class MultipartResumeRequest(BaseModel):
+    session_id: str
+    filename: str
+    upload_id: str
+    part_count: int
+class UploadedPart(BaseModel):
+    part_number: int
+    etag: str
+class MultipartCompleteRequest(BaseModel):
+    session_id: str
+    filename: str
+    upload_id: str
+    parts: List[UploadedPart]
+class MultipartAbortRequest(BaseModel):
+    session_id: str
+    filename: str
+    upload_id: str
 
 # ----------------- Helper Functions -----------------
 
-# Get S3 URIs for a given session_id
-def get_s3_uris(session_id: str) -> list:
+def list_s3_objects(session_id: str) -> list:
     bucket_name = os.getenv('S3_BUCKET_NAME')
-    logger.info(f"Fetching S3 URIs for session_id: {session_id} from bucket: {bucket_name}")    
-    response = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=f"{session_id}/")
+    logger.info("Listing S3 objects for session_id: %s from bucket: %s", session_id, bucket_name)
+    with stage("s3_list"):
+        return list_session_objects(s3_client, bucket_name, session_id)
+
+# Get the (cached) manifest of S3 objects for a given session_id
+def get_session_manifest(session_id: str) -> list:
+    return manifest_cache.get_or_list(session_id, list_s3_objects)
 
-    uris = []
-    for obj in response.get('Contents', []):
-        key = obj['Key']
-        if not key.endswith('/'):  # skip folder itself
-            uris.append(f"s3://{bucket_name}/{key}")
-    return uris
+def touch_session(session_id: str):
+    """Register the session with DBService or restart its TTL clock, so the reaper leaves it alone."""
+    try:
+        requests.post(f"{DB_SERVICE_URL}/sessions", json={"session_id": session_id},
+                      headers=outgoing_headers(), timeout=5).raise_for_status()
+    except requests.RequestException as e:
+        logger.warning("Could not touch session %s in DBService: %s", session_id, e)
+
+def forget_session(session_id: str):
+    manifest_cache.invalidate(session_id)
+    stored_objects.forget(session_id)
+
+def reap_expired_sessions() -> list:
+    return session_reaper.reap_expired_sessions(
+        s3_client,
+        os.getenv("S3_BUCKET_NAME"),
+        DB_SERVICE_URL,
+        limit=SESSION_REAP_BATCH,
+        on_deleted=forget_session,
+        headers=outgoing_headers()
+    )
+
+async def session_reaper_loop():
+    while True:
+        await asyncio.sleep(SESSION_REAPER_INTERVAL)
+        try:
+            reaped = await asyncio.to_thread(reap_expired_sessions)
+            if reaped:
+                logger.info("Reaped %d expired sessions", len(reaped))
+        except Exception:
+            logger.exception("Session reaper run failed")
+
+@app.on_event("startup")
+async def start_session_reaper():
+    if SESSION_REAPER_INTERVAL > 0:
+        asyncio.create_task(session_reaper_loop())
+
+def ndjson_chunk_records(processed_data: dict):
+    """Yield one NDJSON line per chunk in the ExtractorService response, for DBService /store/stream."""
+    for doc_chunk in processed_data.get("document_chunks", []):
+        for idx, text in enumerate(doc_chunk["chunks"]):
+            yield (json.dumps({"uri": doc_chunk["s3_uri"], "chunk_id": idx, "text": text}) + "\n").encode()
+    for yt_chunk in processed_data.get("youtube_chunks", []):
+        for idx, text in enumerate(yt_chunk["chunks"]):
+            yield (json.dumps({"video_id": yt_chunk["video_id"], "chunk_id": idx, "text": text}) + "\n").encode()
+
+def stream_chunks_to_db(session_id: str, tag: str, processed_data: dict) -> dict:
+    """Stream the chunks to DBService, resuming from its last committed window on a retryable failure."""
+    params = {"session_id": session_id, "tag": tag, "stream_id": str(uuid.uuid4())}
+    headers = {"Content-Type": "application/x-ndjson", **outgoing_headers()}
+    for attempt in range(STORE_STREAM_RETRIES + 1):
+        try:
+            response = requests.post(
+                f"{DB_SERVICE_URL}/store/stream",
+                params=params,
+                data=ndjson_chunk_records(processed_data),
+                headers=headers
+            )
+        except requests.ConnectionError as e:
+            if attempt == STORE_STREAM_RETRIES:
+                raise
+            logger.warning("DBService stream %s failed (%s); resuming", params["stream_id"], e)
+            continue
+        merge_server_timing("db", response.headers.get("Server-Timing"))
+        if response.status_code < 500 or attempt == STORE_STREAM_RETRIES:
+            response.raise_for_status()
+            return response.json()
+        logger.warning("DBService stream %s failed: %s; resuming", params["stream_id"], truncate(response.text))
 
 def calculate_k_from_chunks(
     total_chunks: int, 
@@ -97,25 +203,39 @@ def calculate_k_from_chunks(
 def get_k(session_id: str, tag: str) -> int:
     try:
         # Make the GET request to fetch the value of k
-        response = requests.get(f"{DB_SERVICE_URL}/totalChunks", params={ "session_id": session_id, "tag": tag })
+        with stage("get_k"):
+            response = requests.get(
+                f"{DB_SERVICE_URL}/totalChunks",
+                params={ "session_id": session_id, "tag": tag },
+                headers=outgoing_headers()
+            )
         response.raise_for_status()  # Raise an exception for HTTP errors
 
         data = response.json()
-        logger.info(f"Response from DBService for K: {data}")
+        logger.debug("Response from DBService for K: %s", truncate(data))
         total_chunks = data.get("total", 5)  # Default to 5 if the key is not present
         k=  calculate_k_from_chunks(total_chunks)
-        logger.info(f"Calculated K: {k} based on total chunks: {total_chunks}") 
+        logger.info("Calculated K: %s based on total chunks: %s", k, total_chunks)
         # Ensure k is a positive integer
         if not isinstance(k, int) or k <= 0:
-            logger.warning(f"Invalid value for K: {k}. Defaulting to 5.")
+            logger.warning("Invalid value for K: %s. Defaulting to 5.", k)
             k = 5
         
         return k
     except (requests.RequestException, ValueError) as e:
         # Catch errors related to the HTTP request or invalid JSON parsing
-        logger.error(f"Error in get_k: {e}")
+        logger.error("Error in get_k: %s", e)
         return 5
 
+def raise_if_rate_limited(response: requests.Response):
+    """Pass LLMPromptService backpressure (429 + Retry-After) through instead of turning it into a 500."""
+    if response.status_code == 429:
+        raise HTTPException(
+            status_code=429,
+            detail="The language model is busy, please retry later.",
+            headers={"Retry-After": response.headers.get("Retry-After", "1")}
+        )
+
 # ----------------- API Endpoints -----------------
 @app.get("/")
 async def root():
@@ -137,12 +257,14 @@ async def query(request: Request):
     }
 
     try:
-        logger.info(f"Forwarding query to DBService: {payload}")
-        response = requests.post(f"{DB_SERVICE_URL}/search", json=payload)
+        logger.info("Forwarding query to DBService", extra={"session_id": session_id, "tag": tag, "top_k": top_k})
+        with stage("db_search"):
+            response = requests.post(f"{DB_SERVICE_URL}/search", json=payload, headers=outgoing_headers())
+        merge_server_timing("db", response.headers.get("Server-Timing"))
         response.raise_for_status()
         return response.json()
     except Exception as e:
-        logger.error(f"Error in /query: {e}")
+        logger.error("Error in /query: %s", e)
         raise HTTPException(status_code=500, detail="Failed to query DBService.")
 
 @app.get("/query")
@@ -153,7 +275,7 @@ async def combined_query(request: Request):
     session_id = request.query_params.get("session_id", "")
     tag = request.query_params.get("tag", "")
     top_k= get_k(session_id, tag)
-    logger.info(f"Top K: {top_k}") 
+    logger.info("Top K: %s", top_k)
     db_payload = {
         "query": query_text,
         "tag": tag,
@@ -163,22 +285,17 @@ async def combined_query(request: Request):
 
     try:
         # Step 1: Call Database Service
-        logger.info(f"Calling Database Service with: {db_payload}")
-        db_response = requests.post(f"{DB_SERVICE_URL}/search", json=db_payload)
+        logger.info("Calling Database Service", extra={"session_id": session_id, "tag": tag, "top_k": top_k})
+        with stage("db_search"):
+            db_response = requests.post(f"{DB_SERVICE_URL}/search", json=db_payload, headers=outgoing_headers())
+        merge_server_timing("db", db_response.headers.get("Server-Timing"))
         db_response.raise_for_status()
         db_data = db_response.json()
-        logger.info(f"DB Service response: {db_data}")
 
         # Step 2: Extract relevant content
         logger.info("Extracting content from DB response")
         extracted_texts = []
-        logger.info("-------------------------------------------------")
-        logger.info("-------------------------------------------------")
-        logger.info("-------------------------------------------------")
-        logger.info(f"DB response: {db_data}")
-        logger.info("-------------------------------------------------")
-        logger.info("-------------------------------------------------")
-        logger.info("-------------------------------------------------")
+        logger.debug("DB response: %s", truncate(db_data))
         for result in db_data.get('results', []):
             content = result.get('content', '').strip()
             if content:  # Make sure there's actual content
@@ -201,8 +318,8 @@ async def combined_query(request: Request):
         And only give response in text fromat no other formata and no highlights,bolds etc.
         """
 
-        logger.info(f"Combined prompt text prepared with {len(extracted_texts)} pieces")
-        logger.info(f"Combined prompt: {combined_prompt[:500]}...")  # Log only first 100 chars
+        logger.info("Combined prompt text prepared with %d pieces", len(extracted_texts))
+        logger.debug("Combined prompt: %s", truncate(combined_prompt))
 
         # Step 3: Call LLM Prompt Service
         prompt_payload = {
@@ -212,13 +329,18 @@ async def combined_query(request: Request):
         }
 
         logger.info("Sending prompt to LLM Prompt Service")
-        llm_response = requests.post(f"{LLM_PROMPT_SERVICE_URL}/generate", json=prompt_payload)
+        with stage("llm"):
+            llm_response = requests.post(f"{LLM_PROMPT_SERVICE_URL}/generate", json=prompt_payload, headers=outgoing_headers())
+        merge_server_timing("llm", llm_response.headers.get("Server-Timing"))
+        raise_if_rate_limited(llm_response)
         llm_response.raise_for_status()
 
         return llm_response.json()
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception(f"Error in /query: {e}")
+        logger.exception("Error in /query: %s", e)
         raise HTTPException(status_code=500, detail="Failed to process the combined query")
 
 @app.get("/createSession")
@@ -230,11 +352,14 @@ async def create_session():
 
         # Create folder by uploading an empty object
         s3_client.put_object(Bucket=bucket, Key=folder_key)
-        logger.info(f"Created S3 folder for session: {session_id}")
+        logger.info("Created S3 folder for session: %s", session_id)
+
+        # Start the session's TTL clock; DBService also registers it on first /store
+        touch_session(session_id)
 
         return {"session_id": session_id}
     except Exception as e:
-        logger.error(f"Error creating session: {e}")
+        logger.error("Error creating session: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create session")
 
 @app.get("/promptQuery")
@@ -250,77 +375,70 @@ async def prompt_query(request: Request):
     }
 
     try:
-        logger.info(f"Forwarding prompt to LLM Prompt Service: {payload}")
-        response = requests.post(f"{LLM_PROMPT_SERVICE_URL}/generate", json=payload)
+        logger.info("Forwarding prompt to LLM Prompt Service: %s", truncate(prompt_text))
+        with stage("llm"):
+            response = requests.post(f"{LLM_PROMPT_SERVICE_URL}/generate", json=payload, headers=outgoing_headers())
+        merge_server_timing("llm", response.headers.get("Server-Timing"))
+        raise_if_rate_limited(response)
         response.raise_for_status()
         return response.json()
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error in /promptQuery: {e}")
+        logger.error("Error in /promptQuery: %s", e)
         raise HTTPException(status_code=500, detail="Failed to query Prompt Service.")
 
 @app.post("/store")
 def store_documents(request: StoreRequest):
     try:
-        logger.info(f"Fetching S3 URIs for session_id: {request.session_id}")
-        s3_uris = get_s3_uris(request.session_id)
-        logger.info(f"Found {len(s3_uris)} S3 URIs for session_id: {request.session_id}")
-        logger.info(f"Request payload: {s3_uris}")
+        manifest = get_session_manifest(request.session_id)
+        s3_uris = [obj["uri"] for obj in manifest]
+        logger.info("Found %d S3 URIs for session_id: %s", len(s3_uris), request.session_id)
+        logger.debug("S3 URIs: %s", truncate(s3_uris))
         if not s3_uris:
             raise HTTPException(status_code=404, detail="No documents found in S3 for this session_id")
 
+        # Objects already stored under this tag with the same ETag are not extracted or stored again
+        pending = stored_objects.pending(request.session_id, request.tag, manifest)
+        if not pending and not request.yt_list:
+            logger.info("All %d S3 objects already stored for tag %s", len(s3_uris), request.tag)
+            return {"message": "Documents stored successfully"}
+
         payload_to_extractor = {
-            "documents": s3_uris
+            "documents": [obj["uri"] for obj in pending],
+            "manifest": manifest_metadata(pending)
         }
         if request.yt_list:
             payload_to_extractor["youtube_videos"] = request.yt_list
         
-        logger.info("-------------------------------------------------")
-        logger.info(f"Payload to ExtractorService: {payload_to_extractor}")
-        logger.info("-------------------------------------------------")
-        logger.info(f"Calling ExtractorService with {len(s3_uris)} S3 URIs -->{payload_to_extractor}")
-        
-        extractor_response = requests.post(
-            f"{EXTRACTOR_SERVICE_URL}/process",
-            json=payload_to_extractor
+        logger.info(
+            "Calling ExtractorService with %d of %d S3 URIs and %d videos",
+            len(pending), len(s3_uris), len(request.yt_list or [])
         )
-        logger.info(f"ExtractorService response: {extractor_response.status_code}")
+        
+        with stage("extract"):
+            extractor_response = requests.post(
+                f"{EXTRACTOR_SERVICE_URL}/process",
+                json=payload_to_extractor,
+                headers=outgoing_headers()
+            )
+        merge_server_timing("extractor", extractor_response.headers.get("Server-Timing"))
+        logger.info("ExtractorService response: %s", extractor_response.status_code)
         extractor_response.raise_for_status()
         processed_data = extractor_response.json()
 
-        # Transforming processed data into DBService format
-        db_request_payload = {
-            "session_id": request.session_id,
-            "tag": request.tag,
-            "documents": []
-        }
-
-        # Process document chunks from ExtractorService response
-        for doc_chunk in processed_data.get("document_chunks", []):
-            doc = {
-                "uri": doc_chunk["s3_uri"],
-                "chunks": [{"chunk_id": idx, "text": text} for idx, text in enumerate(doc_chunk["chunks"])]
-            }
-            db_request_payload["documents"].append(doc)
-
-        # Process YouTube chunks if any (though the example shows empty youtube_chunks)
-        for yt_chunk in processed_data.get("youtube_chunks", []):
-            doc = {
-                "video_id": yt_chunk["video_id"],  # Assuming this field exists in the response
-                "chunks": [{"chunk_id": idx, "text": text} for idx, text in enumerate(yt_chunk["chunks"])]
-            }
-            db_request_payload["documents"].append(doc)
-
-        logger.info(f"Transformed data for DBService: {db_request_payload}")
-        logger.info(f"Sending {len(db_request_payload['documents'])} documents to DBService")
-        logger.info("-------------------------------------------------")
-        logger.info(f"DB request payload: {db_request_payload}")
-        logger.info("-------------------------------------------------")
-        
-        db_response = requests.post(
-            f"{DB_SERVICE_URL}/store",
-            json=db_request_payload
+        logger.info(
+            "Streaming %d documents and %d videos to DBService",
+            len(processed_data.get("document_chunks", [])),
+            len(processed_data.get("youtube_chunks", [])),
+            extra={"session_id": request.session_id, "tag": request.tag}
         )
-        db_response.raise_for_status()
+
+        with stage("db_store"):
+            summary = stream_chunks_to_db(request.session_id, request.tag, processed_data)
+        logger.info("DBService stored %s chunks in %s windows", summary.get("stored"), summary.get("windows"))
+        extracted = {doc_chunk["s3_uri"] for doc_chunk in processed_data.get("document_chunks", [])}
+        stored_objects.mark_stored(request.session_id, request.tag, [obj for obj in pending if obj["uri"] in extracted])
 
         return {"message": "Documents stored successfully"}
 
@@ -334,26 +452,102 @@ def get_presigned_urls(req: UploadRequest):
         bucket = os.getenv("S3_BUCKET_NAME")
         urls = {}
 
+        # The new objects' ETags are unknown until the client uploads them
+        manifest_cache.invalidate(req.session_id)
+        touch_session(req.session_id)
         for name in req.filenames:
             key = f"{req.session_id}/{name}"
-            url = s3_client.generate_presigned_url(
-                ClientMethod='put_object',
-                Params={
-                    'Bucket': bucket,
-                    'Key': key,
-                    'ContentType': 'application/pdf'  # match the upload
-                },
-                ExpiresIn=3600,
-                HttpMethod='PUT'  # very important!
-            )
-            urls[name] = url
+            # The client must PUT with the same Content-Type
+            urls[name] = s3_uploads.presign_put(s3_client, bucket, key)
 
         return {"presigned_urls": urls}
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except ClientError as e:
-        logger.error(f"Error generating presigned URLs: {e}")
+        logger.error("Error generating presigned URLs: %s", e)
         raise HTTPException(status_code=500, detail="Failed to generate upload URLs")
+
+@app.post("/uploadDocs/multipart/start")
+def start_multipart_upload(req: MultipartStartRequest):
+    try:
+        manifest_cache.invalidate(req.session_id)
+        touch_session(req.session_id)
+        upload = s3_uploads.start_multipart_upload(
+            s3_client,
+            os.getenv("S3_BUCKET_NAME"),
+            f"{req.session_id}/{req.filename}",
+            req.size,
+            req.part_size
+        )
+        logger.info(
+            "Started multipart upload for %s with %d parts", req.filename, len(upload["parts"]),
+            extra={"session_id": req.session_id, "upload_id": upload["upload_id"]}
+        )
+        return upload
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientError as e:
+        logger.error("Error starting multipart upload: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to start multipart upload")
+
+@app.post("/uploadDocs/multipart/resume")
+def resume_multipart_upload(req: MultipartResumeRequest):
+    try:
+        return s3_uploads.resume_multipart_upload(
+            s3_client,
+            os.getenv("S3_BUCKET_NAME"),
+            f"{req.session_id}/{req.filename}",
+            req.upload_id,
+            req.part_count
+        )
+    except ClientError as e:
+        logger.error("Error resuming multipart upload: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to resume multipart upload")
+
+@app.post("/uploadDocs/multipart/complete")
+def complete_multipart_upload(req: MultipartCompleteRequest):
+    try:
+        result = s3_uploads.complete_multipart_upload(
+            s3_client,
+            os.getenv("S3_BUCKET_NAME"),
+            f"{req.session_id}/{req.filename}",
+            req.upload_id,
+            [part.model_dump() for part in req.parts]
+        )
+        manifest_cache.invalidate(req.session_id)
+        logger.info("Completed multipart upload for %s", req.filename, extra={"session_id": req.session_id})
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientError as e:
+        logger.error("Error completing multipart upload: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to complete multipart upload")
+
+@app.post("/uploadDocs/multipart/abort")
+def abort_multipart_upload(req: MultipartAbortRequest):
+    try:
+        s3_uploads.abort_multipart_upload(
+            s3_client,
+            os.getenv("S3_BUCKET_NAME"),
+            f"{req.session_id}/{req.filename}",
+            req.upload_id
+        )
+        logger.info("Aborted multipart upload for %s", req.filename, extra={"session_id": req.session_id})
+        return {"message": "Upload aborted"}
+    except ClientError as e:
+        logger.error("Error aborting multipart upload: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to abort multipart upload")
     
+@app.post("/sessions/reap")
+def reap_sessions():
+    """Run one reaper pass now (e.g. from a scheduler when the background loop is disabled)."""
+    try:
+        return {"reaped": reap_expired_sessions()}
+    except requests.RequestException as e:
+        logger.error("Error reaping sessions: %s", e)
+        raise HTTPException(status_code=502, detail="Failed to list expired sessions")
+
 # Health Check
 @app.get("/health")
 async def health_check():
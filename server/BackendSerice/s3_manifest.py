@@ -0,0 +1,119 @@
+"""Session manifests: the objects under a session's S3 prefix, with ETag and size.
+
+``list_session_objects`` follows ``list_objects_v2`` continuation tokens, so sessions
+with more than 1000 objects are listed completely. ``SessionManifestCache`` keeps the
+result per session so repeated ``/store`` calls don't re-list the prefix; the upload
+endpoints invalidate it. The cache is per process and uploads finish on the client
+after the presigned URL is issued, so an empty manifest is never cached: it is
+treated as a miss and re-listed, and ``ttl_seconds`` bounds how stale a non-empty one
+can be.
+
+``StoredObjects`` remembers the ETag of every object ``/store`` has stored per session
+and tag, so a later ``/store`` only extracts and stores new or changed objects. It is
+per process too: a ``/store`` handled by another worker stores everything again.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+ManifestEntry = Dict[str, object]
+
+
+def list_session_objects(s3_client, bucket: str, session_id: str, page_size: int = 1000) -> List[ManifestEntry]:
+    """List every object under ``<session_id>/``, skipping the folder marker."""
+    params = {"Bucket": bucket, "Prefix": f"{session_id}/", "MaxKeys": page_size}
+    objects = []
+    while True:
+        response = s3_client.list_objects_v2(**params)
+        for obj in response.get("Contents", []):
+            key = obj["Key"]
+            if key.endswith("/"):  # skip folder itself
+                continue
+            objects.append({
+                "key": key,
+                "uri": f"s3://{bucket}/{key}",
+                "etag": obj.get("ETag", "").strip('"'),
+                "size": obj.get("Size", 0),
+            })
+        if not response.get("IsTruncated"):
+            return objects
+        params["ContinuationToken"] = response["NextContinuationToken"]
+
+
+def manifest_metadata(objects: List[ManifestEntry]) -> Dict[str, Dict[str, object]]:
+    """``{uri: {"etag": ..., "size": ...}}`` as sent to ExtractorService."""
+    return {obj["uri"]: {"etag": obj["etag"], "size": obj["size"]} for obj in objects}
+
+
+class SessionManifestCache:
+    """Bounded, thread-safe per-session manifest cache with a TTL."""
+
+    def __init__(self, ttl_seconds: float = 300.0, max_sessions: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[List[ManifestEntry]]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            stored_at, objects = entry
+            if self._clock() - stored_at > self.ttl_seconds:
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return list(objects)
+
+    def put(self, session_id: str, objects: List[ManifestEntry]) -> None:
+        with self._lock:
+            self._entries[session_id] = (self._clock(), list(objects))
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def get_or_list(self, session_id: str, lister: Callable[[str], List[ManifestEntry]]) -> List[ManifestEntry]:
+        """Return the cached manifest, listing S3 through ``lister`` on a miss or an empty manifest."""
+        objects = self.get(session_id)
+        if not objects:
+            objects = lister(session_id)
+            if objects:
+                self.put(session_id, objects)
+        return objects
+
+
+class StoredObjects:
+    """Bounded, thread-safe record of the ``{uri: etag}`` stored per (session, tag)."""
+
+    def __init__(self, max_sessions: int = 1024):
+        self.max_sessions = max_sessions
+        self._entries: "OrderedDict[tuple, Dict[str, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def pending(self, session_id: str, tag: str, objects: List[ManifestEntry]) -> List[ManifestEntry]:
+        """The manifest objects not yet stored under ``tag``, or stored with another ETag."""
+        with self._lock:
+            stored = self._entries.get((session_id, tag), {})
+            return [obj for obj in objects if stored.get(obj["uri"]) != obj["etag"]]
+
+    def mark_stored(self, session_id: str, tag: str, objects: List[ManifestEntry]) -> None:
+        """Record ``objects`` once their chunks are committed in DBService."""
+        with self._lock:
+            stored = self._entries.setdefault((session_id, tag), {})
+            stored.update({obj["uri"]: obj["etag"] for obj in objects})
+            self._entries.move_to_end((session_id, tag))
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session_id]:
+                del self._entries[key]
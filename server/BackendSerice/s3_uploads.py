@@ -0,0 +1,122 @@
+"""Presigned S3 uploads: single PUT for small files, multipart for large decks and PDFs.
+
+A multipart upload is started server-side and the client gets one presigned
+``upload_part`` URL per part, so parts can be sent in parallel and retried
+individually. After a failure the client asks for the parts S3 already has
+(``resume_multipart_upload``) and only re-sends the rest, then completes or aborts.
+"""
+
+import math
+import os
+from typing import Dict, List, Optional
+
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "txt": "text/plain",
+}
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+MAX_PARTS = 10000
+URL_EXPIRES_IN = 3600
+
+
+def content_type_for(filename: str) -> str:
+    """Content type for the file types ExtractorService can parse; ``ValueError`` otherwise."""
+    ext = os.path.splitext(filename)[1][1:].lower()
+    if ext not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported file type: {ext or filename}")
+    return CONTENT_TYPES[ext]
+
+
+def plan_part_size(size: int, part_size: Optional[int] = None) -> int:
+    """Part size to use for a ``size``-byte object, respecting S3's minimum and 10,000-part cap."""
+    if size <= 0:
+        raise ValueError("size must be positive")
+    part_size = max(part_size or DEFAULT_PART_SIZE, MIN_PART_SIZE)
+    return max(part_size, math.ceil(size / MAX_PARTS))
+
+
+def presign_put(s3_client, bucket: str, key: str, expires_in: int = URL_EXPIRES_IN) -> str:
+    return s3_client.generate_presigned_url(
+        ClientMethod='put_object',
+        Params={'Bucket': bucket, 'Key': key, 'ContentType': content_type_for(key)},
+        ExpiresIn=expires_in,
+        HttpMethod='PUT'
+    )
+
+
+def presign_parts(s3_client, bucket: str, key: str, upload_id: str, part_numbers: List[int],
+                  expires_in: int = URL_EXPIRES_IN) -> List[Dict[str, object]]:
+    return [
+        {
+            "part_number": number,
+            "url": s3_client.generate_presigned_url(
+                ClientMethod='upload_part',
+                Params={'Bucket': bucket, 'Key': key, 'UploadId': upload_id, 'PartNumber': number},
+                ExpiresIn=expires_in,
+                HttpMethod='PUT'
+            ),
+        }
+        for number in part_numbers
+    ]
+
+
+def start_multipart_upload(s3_client, bucket: str, key: str, size: int,
+                           part_size: Optional[int] = None) -> Dict[str, object]:
+    content_type = content_type_for(key)
+    part_size = plan_part_size(size, part_size)
+    part_count = math.ceil(size / part_size)
+    upload = s3_client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)
+    upload_id = upload["UploadId"]
+    return {
+        "key": key,
+        "upload_id": upload_id,
+        "content_type": content_type,
+        "part_size": part_size,
+        "parts": presign_parts(s3_client, bucket, key, upload_id, list(range(1, part_count + 1))),
+    }
+
+
+def list_uploaded_parts(s3_client, bucket: str, key: str, upload_id: str) -> List[Dict[str, object]]:
+    parts = []
+    params = {"Bucket": bucket, "Key": key, "UploadId": upload_id}
+    while True:
+        response = s3_client.list_parts(**params)
+        for part in response.get("Parts", []):
+            parts.append({"part_number": part["PartNumber"], "etag": part["ETag"], "size": part.get("Size", 0)})
+        if not response.get("IsTruncated"):
+            return parts
+        params["PartNumberMarker"] = response["NextPartNumberMarker"]
+
+
+def resume_multipart_upload(s3_client, bucket: str, key: str, upload_id: str, part_count: int) -> Dict[str, object]:
+    """Parts S3 already has, plus fresh URLs for the ones still missing."""
+    uploaded = list_uploaded_parts(s3_client, bucket, key, upload_id)
+    done = {part["part_number"] for part in uploaded}
+    missing = [number for number in range(1, part_count + 1) if number not in done]
+    return {
+        "key": key,
+        "upload_id": upload_id,
+        "uploaded": uploaded,
+        "parts": presign_parts(s3_client, bucket, key, upload_id, missing),
+    }
+
+
+def complete_multipart_upload(s3_client, bucket: str, key: str, upload_id: str,
+                              parts: List[Dict[str, object]]) -> Dict[str, object]:
+    if not parts:
+        raise ValueError("At least one part is required to complete an upload")
+    ordered = sorted(parts, key=lambda part: int(part["part_number"]))
+    response = s3_client.complete_multipart_upload(
+        Bucket=bucket,
+        Key=key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": [{"PartNumber": int(p["part_number"]), "ETag": p["etag"]} for p in ordered]},
+    )
+    return {"key": key, "etag": response.get("ETag", "").strip('"')}
+
+
+def abort_multipart_upload(s3_client, bucket: str, key: str, upload_id: str) -> None:
+    s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
@@ -0,0 +1,67 @@
+"""Expire idle sessions: claim them, delete their S3 prefix, then their rows in DBService.
+
+DBService tracks when each session was last used and lists the ones past their
+TTL. For each, the reaper first claims the session in DBService, which only
+succeeds if it is still expired, so a session used or uploaded to since it was
+listed is skipped. It then deletes the objects under ``<session_id>/`` with
+``delete_objects`` (at most 1000 keys per call, the S3 limit) and only then asks
+DBService to delete the session's rows. A claimed session stays listed until its
+rows are gone, so a failed delete is retried on the next run.
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+S3_DELETE_BATCH = 1000
+
+
+def delete_session_prefix(s3_client, bucket: str, session_id: str, batch_size: int = S3_DELETE_BATCH) -> int:
+    """Delete every object under ``<session_id>/`` (folder marker included); returns objects deleted."""
+    deleted = 0
+    while True:
+        # Each page is deleted before the next listing, so always list from the start of the prefix
+        response = s3_client.list_objects_v2(Bucket=bucket, Prefix=f"{session_id}/", MaxKeys=batch_size)
+        keys = [{"Key": obj["Key"]} for obj in response.get("Contents", [])]
+        if not keys:
+            return deleted
+        result = s3_client.delete_objects(Bucket=bucket, Delete={"Objects": keys, "Quiet": True})
+        errors = result.get("Errors", [])
+        if errors:
+            raise RuntimeError(f"Failed to delete {len(errors)} objects under {session_id}/: {errors[0]}")
+        deleted += len(keys)
+        if not response.get("IsTruncated"):
+            return deleted
+
+
+def reap_expired_sessions(s3_client, bucket: str, db_service_url: str, limit: int = 100,
+                          on_deleted: Optional[Callable[[str], None]] = None,
+                          headers: Optional[Dict[str, str]] = None, http=requests) -> List[str]:
+    """Delete up to ``limit`` expired sessions; returns the ids that were fully deleted."""
+    response = http.get(f"{db_service_url}/sessions/expired", params={"limit": limit}, headers=headers)
+    response.raise_for_status()
+    reaped = []
+    for session_id in response.json()["session_ids"]:
+        try:
+            claim = http.post(f"{db_service_url}/sessions/{session_id}/claim", headers=headers)
+            claim.raise_for_status()
+            if not claim.json()["claimed"]:
+                logger.info("Session %s was used since it was listed; not reaping it", session_id)
+                continue
+            objects = delete_session_prefix(s3_client, bucket, session_id)
+            db_response = http.delete(f"{db_service_url}/sessions/{session_id}", headers=headers)
+            db_response.raise_for_status()
+        except Exception:
+            logger.exception("Failed to reap session %s", session_id)
+            continue
+        if on_deleted is not None:
+            on_deleted(session_id)
+        logger.info(
+            "Reaped session %s", session_id,
+            extra={"objects": objects, "chunks": db_response.json().get("deleted_chunks")}
+        )
+        reaped.append(session_id)
+    return reaped
@@ -0,0 +1,59 @@
+"""Nearest-neighbour search for many queries in one SQL round trip.
+
+The query embeddings and the (session, tag) targets are sent as arrays; a LATERAL
+join runs one nearest-neighbour lookup (see ``vector_storage``) per (query, target)
+pair, each pruned to the target session's partition and using the
+``(session_id, tag)`` index. Per query, the hits of all targets are then merged by
+distance and cut to ``top_k``.
+"""
+
+import json
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+from vector_storage import candidate_count, embedding_type, nearest_sql, prefilter_settings
+
+
+def batch_search_sql(storage: str) -> str:
+    nearest = nearest_sql(
+        storage,
+        where="session_id = t.session_id AND tag = t.tag",
+        query="q.embedding",
+        limit="$4",
+        candidates="$5",
+    )
+    return f"""
+        SELECT q.idx, d.id, d.content, d.chunk_id, d.tag, d.uri, d.video_id, d.session_id, d.distance
+        FROM (
+            SELECT idx, embedding::{embedding_type(storage)} AS embedding
+            FROM unnest($1::text[]) WITH ORDINALITY AS u(embedding, idx)
+        ) AS q
+        CROSS JOIN unnest($2::text[], $3::text[]) AS t(session_id, tag)
+        CROSS JOIN LATERAL ({nearest}) AS d
+    """
+
+
+def group_results(rows: Sequence, query_count: int, top_k: int) -> List[List[Dict]]:
+    """Per query (in input order), its ``top_k`` nearest rows across all targets."""
+    grouped: Dict[int, List[Dict]] = defaultdict(list)
+    for row in rows:
+        hit = dict(row)
+        grouped[hit.pop("idx")].append(hit)
+    # WITH ORDINALITY numbers from 1
+    return [sorted(grouped[i + 1], key=lambda hit: hit["distance"])[:top_k] for i in range(query_count)]
+
+
+async def search_chunks_batch(conn, embeddings: List[List[float]], targets: List[Tuple[str, str]],
+                              top_k: int, storage: str = "vector", overfetch: int = 10) -> List[List[Dict]]:
+    """Nearest chunks for every embedding over every ``(session_id, tag)`` target, in one statement."""
+    args = [
+        [json.dumps(embedding) for embedding in embeddings],
+        [session_id for session_id, _ in targets],
+        [tag for _, tag in targets],
+        top_k,
+    ]
+    if storage != "vector":
+        args.append(candidate_count(top_k, overfetch))
+        await conn.execute(prefilter_settings(args[-1]))
+    rows = await conn.fetch(batch_search_sql(storage), *args)
+    return group_results(rows, len(embeddings), top_k)
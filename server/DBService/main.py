@@ -4,13 +4,23 @@ import asyncpg
 import uvicorn
 import httpx
 import json
-from fastapi import FastAPI, HTTPException, Query
+import uuid
+from fastapi import FastAPI, HTTPException, Query, Request
 from pydantic import BaseModel
 from typing import List, Optional
 from dotenv import load_dotenv
 
+from common.observability import instrument_app, stage, outgoing_headers
+from common.logging_config import configure_logging, truncate
+from sessions import SessionNotClaimed, claim_expired_session, delete_session, list_expired_sessions, touch_session
+from batch_search import search_chunks_batch
+from vector_storage import (
+    candidate_count, embedding_column, embedding_type, nearest_sql, prefilter_settings, storage_mode
+)
+from stream_store import StreamConflict, get_progress, iter_lines, store_stream
+
 # Logging setup
-logging.basicConfig(level=logging.INFO)
+configure_logging("db")
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
@@ -28,6 +38,14 @@ DB_NAME = os.getenv("POSTGRES_DB", "postgres")
 
 DB_DSN = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+SESSION_TOUCH_INTERVAL = float(os.getenv("SESSION_TOUCH_INTERVAL", "60"))
+SESSION_DELETE_BATCH = int(os.getenv("SESSION_DELETE_BATCH", "1000"))
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "256"))
+STORE_WINDOW_SIZE = int(os.getenv("STORE_WINDOW_SIZE", "64"))
+EMBEDDING_STORAGE = storage_mode(os.getenv("EMBEDDING_STORAGE", "vector"))
+SEARCH_OVERFETCH = int(os.getenv("SEARCH_OVERFETCH", "10"))  # halfvec mode: candidates re-ranked per result
+
 
 from fastapi.middleware.cors import CORSMiddleware
 app.add_middleware(
@@ -37,6 +55,7 @@ app.add_middleware(
     allow_methods=["*"],  # Allows all methods (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # Allows all headers
 )
+instrument_app(app, "db")
 
 # ---------------- Models ----------------
 
@@ -60,17 +79,35 @@ class SearchRequest(BaseModel):
     session_id: str
     top_k: int = 5
 
+class SessionRequest(BaseModel):
+    session_id: str
+
+class SearchTarget(BaseModel):
+    session_id: str
+    tag: str
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    targets: List[SearchTarget]
+    top_k: int = 5
+
 # --------------- Embedding ----------------
 
 async def get_embedding(text: str) -> List[float]:
+    return (await get_embeddings([text]))[0]
+
+async def get_embeddings(texts: List[str]) -> List[List[float]]:
+    """Embed ``texts`` with a single feature-extraction call."""
     headers = {
         "Authorization": f"Bearer {HF_API_TOKEN}",
-        "Content-Type": "application/json"
+        "Content-Type": "application/json",
+        **outgoing_headers()
     }
     async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(HF_API_URL, headers=headers, json={"inputs": text})
+        with stage("embed"):
+            response = await client.post(HF_API_URL, headers=headers, json={"inputs": texts})
         if response.status_code != 200:
-            logger.error(f"HF API error: {response.text}")
+            logger.error("HF API error: %s", truncate(response.text))
             raise HTTPException(status_code=500, detail="Embedding API error")
         return response.json()
 
@@ -78,20 +115,27 @@ async def get_embedding(text: str) -> List[float]:
 
 async def store_chunk(conn, chunk: Chunk, tag: str, embedding: List[float], uri: Optional[str], video_id: Optional[str], session_id: str):
     embedding_str = json.dumps(embedding)
-    await conn.execute("""
-        INSERT INTO documents (content, chunk_id, tag, embedding, uri, video_id, session_id)
-        VALUES ($1, $2, $3, $4, $5, $6, $7)
-    """, chunk.text, chunk.chunk_id, tag, embedding_str, uri, video_id, session_id)
+    with stage("db_insert"):
+        await conn.execute(f"""
+            INSERT INTO documents (content, chunk_id, tag, {embedding_column(EMBEDDING_STORAGE)}, uri, video_id, session_id)
+            VALUES ($1, $2, $3, $4::{embedding_type(EMBEDDING_STORAGE)}, $5, $6, $7)
+        """, chunk.text, chunk.chunk_id, tag, embedding_str, uri, video_id, session_id)
 
 async def search_chunks(conn, embedding: List[float], tag: str, session_id: str, top_k: int):
     embedding_str = json.dumps(embedding)
-    rows = await conn.fetch("""
-        SELECT id, content, chunk_id, tag, uri, video_id, session_id
-        FROM documents
-        WHERE tag = $1 AND session_id = $2
-        ORDER BY embedding <-> $3
-        LIMIT $4
-    """, tag, session_id, embedding_str, top_k)
+    query = nearest_sql(
+        EMBEDDING_STORAGE,
+        where="tag = $1 AND session_id = $2",
+        query=f"$3::{embedding_type(EMBEDDING_STORAGE)}",
+        limit="$4",
+        candidates="$5"
+    )
+    args = [tag, session_id, embedding_str, top_k]
+    with stage("db_search"):
+        if EMBEDDING_STORAGE != "vector":
+            args.append(candidate_count(top_k, SEARCH_OVERFETCH))
+            await conn.execute(prefilter_settings(args[-1]))
+        rows = await conn.fetch(query, *args)
     return [dict(row) for row in rows]
 
 async def get_total_chunks(conn, tag: str, session_id: str):
@@ -116,9 +160,13 @@ async def get_total_chunks(conn, tag: str, session_id: str):
 
 @app.post("/store")
 async def store_documents(request: StoreRequest):
-    logger.info(f"Storing documents under session: {request.session_id}, tag: {request.tag}")
+    logger.info(
+        "Storing %d documents under session: %s, tag: %s",
+        len(request.documents), request.session_id, request.tag
+    )
     try:
         conn = await asyncpg.connect(DB_DSN)
+        await touch_session(conn, request.session_id, SESSION_TOUCH_INTERVAL)
         for doc in request.documents:
             for chunk in doc.chunks:
                 embedding = await get_embedding(chunk.text)
@@ -137,11 +185,63 @@ async def store_documents(request: StoreRequest):
         logger.exception("Storage error")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/store/stream")
+async def store_documents_stream(
+    request: Request,
+    session_id: str = Query(...),
+    tag: str = Query(...),
+    stream_id: Optional[str] = Query(None),
+    window: int = Query(STORE_WINDOW_SIZE, ge=1, le=1024)
+):
+    """Store NDJSON chunk records window by window; retry with the same ``stream_id`` to resume."""
+    stream_id = stream_id or str(uuid.uuid4())
+    logger.info("Streaming store %s under session: %s, tag: %s", stream_id, session_id, tag)
+
+    def on_window(committed: int):
+        logger.info("Stream %s: %d records committed", stream_id, committed)
+
+    conn = await asyncpg.connect(DB_DSN)
+    try:
+        await touch_session(conn, session_id, SESSION_TOUCH_INTERVAL)
+        return await store_stream(
+            conn, iter_lines(request.stream()), session_id, tag, stream_id,
+            embed=get_embeddings, window_size=window, on_window=on_window, storage=EMBEDDING_STORAGE
+        )
+    except StreamConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        try:
+            progress = await get_progress(conn, stream_id)
+            committed = progress["committed_records"] if progress else 0
+        except Exception:
+            committed = None  # the connection itself failed; GET /store/stream/{stream_id} reports it later
+        logger.exception("Streaming store error after %s committed records", committed)
+        # Bad input (malformed or oversized lines) won't succeed on retry; anything else can resume
+        status_code = 400 if isinstance(e, ValueError) else 500
+        raise HTTPException(
+            status_code=status_code,
+            detail={"error": str(e), "stream_id": stream_id, "committed_records": committed}
+        )
+    finally:
+        await conn.close()
+
+@app.get("/store/stream/{stream_id}")
+async def store_stream_progress(stream_id: str):
+    conn = await asyncpg.connect(DB_DSN)
+    try:
+        progress = await get_progress(conn, stream_id)
+    finally:
+        await conn.close()
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Unknown stream")
+    return progress
+
 @app.post("/search")
 async def search_documents(request: SearchRequest):
-    logger.info(f"Searching for session: {request.session_id}, tag: {request.tag}")
+    logger.info("Searching for session: %s, tag: %s", request.session_id, request.tag)
     try:
         conn = await asyncpg.connect(DB_DSN)
+        await touch_session(conn, request.session_id, SESSION_TOUCH_INTERVAL)
         query_embedding = await get_embedding(request.query)
         results = await search_chunks(conn, query_embedding, request.tag, request.session_id, request.top_k)
         await conn.close()
@@ -150,14 +250,43 @@ async def search_documents(request: SearchRequest):
         logger.exception("Search error")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/search/batch")
+async def search_documents_batch(request: BatchSearchRequest):
+    queries = list(dict.fromkeys(request.queries))  # results are keyed by query, so duplicates collapse
+    targets = list(dict.fromkeys((t.session_id, t.tag) for t in request.targets))
+    if not queries or not targets:
+        raise HTTPException(status_code=400, detail="At least one query and one target are required")
+    if len(queries) > SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400, detail=f"At most {SEARCH_BATCH_MAX_QUERIES} queries per batch"
+        )
+    logger.info("Batch search: %d queries over %d targets", len(queries), len(targets))
+    try:
+        conn = await asyncpg.connect(DB_DSN)
+        for session_id in dict.fromkeys(session_id for session_id, _ in targets):
+            await touch_session(conn, session_id, SESSION_TOUCH_INTERVAL)
+        embeddings = await get_embeddings(queries)
+        with stage("db_search"):
+            hits = await search_chunks_batch(
+                conn, embeddings, targets, request.top_k, storage=EMBEDDING_STORAGE, overfetch=SEARCH_OVERFETCH
+            )
+        await conn.close()
+        return {"results": dict(zip(queries, hits))}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Batch search error")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/totalChunks")
 async def get_total_chunks_endpoint(
     tag: str = Query(...),
     session_id: str = Query(...)
 ):
-    logger.info(f"Total chunks requested for session: {session_id}, tag: {tag}")
+    logger.info("Total chunks requested for session: %s, tag: %s", session_id, tag)
     try:
         conn = await asyncpg.connect(DB_DSN)
+        await touch_session(conn, session_id, SESSION_TOUCH_INTERVAL)
         total_chunks = await get_total_chunks(conn, tag, session_id)
         await conn.close()
         total_chunks = 5 if total_chunks == -1 else total_chunks
@@ -169,14 +298,64 @@ async def get_total_chunks_endpoint(
         logger.exception("Get total chunks error")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/sessions")
+async def register_session(request: SessionRequest):
+    try:
+        conn = await asyncpg.connect(DB_DSN)
+        await touch_session(conn, request.session_id, SESSION_TOUCH_INTERVAL)
+        await conn.close()
+        return {"session_id": request.session_id}
+    except Exception as e:
+        logger.exception("Session registration error")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/sessions/expired")
+async def expired_sessions(limit: int = Query(100, ge=1, le=1000)):
+    try:
+        conn = await asyncpg.connect(DB_DSN)
+        session_ids = await list_expired_sessions(conn, SESSION_TTL_SECONDS, limit)
+        await conn.close()
+        return {"session_ids": session_ids}
+    except Exception as e:
+        logger.exception("Expired sessions lookup error")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/sessions/{session_id}/claim")
+async def claim_session(session_id: str):
+    """Claim an expired session for the reaper; ``claimed`` is false if it was used since it was listed."""
+    try:
+        conn = await asyncpg.connect(DB_DSN)
+        claimed = await claim_expired_session(conn, session_id, SESSION_TTL_SECONDS)
+        await conn.close()
+        return {"session_id": session_id, "claimed": claimed}
+    except Exception as e:
+        logger.exception("Session claim error")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/sessions/{session_id}")
+async def delete_session_endpoint(session_id: str):
+    conn = await asyncpg.connect(DB_DSN)
+    try:
+        with stage("db_delete"):
+            deleted = await delete_session(conn, session_id, SESSION_DELETE_BATCH)
+        logger.info("Deleted session %s (%d chunks)", session_id, deleted)
+        return {"session_id": session_id, "deleted_chunks": deleted}
+    except SessionNotClaimed as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.exception("Session deletion error")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await conn.close()
+
 @app.get("/health")
 def health_check():
-    logger.info("Health check requested")
+    logger.debug("Health check requested")
     return {"status": "ok"}
 
 @app.get("/")
 def root():
-    logger.info("Root endpoint accessed")
+    logger.debug("Root endpoint accessed")
     return {"message": "DB Service is running"}
 
 # -------------- Run Server ----------------
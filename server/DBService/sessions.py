@@ -0,0 +1,82 @@
+"""Session metadata and cleanup for the ``documents`` table.
+
+Every session has a row in ``sessions`` whose ``last_accessed_at`` is bumped by
+store/search calls (at most once per ``touch_interval`` to keep searches read-only
+in the common case). Sessions idle for longer than the TTL are listed by
+``list_expired_sessions``. Before deleting anything the reaper claims a session with
+``claim_expired_session``, which only succeeds if it is still expired, so a session
+used after it was listed is left alone. A claimed session is never touched again, and
+``delete_session`` refuses unclaimed ones; it removes their chunks in bounded
+batches, so a large session never holds locks or bloats WAL in one statement.
+``documents`` is hash-partitioned by ``session_id`` (see ``database/init.sql``), so
+both the deletes and the searches stay inside one partition.
+"""
+
+from typing import List
+
+
+class SessionNotClaimed(Exception):
+    """``delete_session`` was called for a session the reaper has not claimed."""
+
+
+async def touch_session(conn, session_id: str, touch_interval: float = 60.0) -> None:
+    """Register ``session_id`` or bump its ``last_accessed_at`` if older than ``touch_interval`` seconds."""
+    await conn.execute("""
+        INSERT INTO sessions (session_id) VALUES ($1)
+        ON CONFLICT (session_id) DO UPDATE SET last_accessed_at = now()
+        WHERE sessions.reaping_at IS NULL
+            AND sessions.last_accessed_at < now() - make_interval(secs => $2)
+    """, session_id, touch_interval)
+
+
+async def list_expired_sessions(conn, ttl_seconds: float, limit: int) -> List[str]:
+    """Up to ``limit`` sessions not accessed for ``ttl_seconds`` (or already claimed), least recently used first."""
+    rows = await conn.fetch("""
+        SELECT session_id FROM sessions
+        WHERE reaping_at IS NOT NULL OR last_accessed_at < now() - make_interval(secs => $1)
+        ORDER BY last_accessed_at
+        LIMIT $2
+    """, ttl_seconds, limit)
+    return [row["session_id"] for row in rows]
+
+
+async def claim_expired_session(conn, session_id: str, ttl_seconds: float) -> bool:
+    """Mark ``session_id`` as being reaped if it is still expired; False if it was used since.
+
+    A claim is kept until ``delete_session`` removes the row, so a reap that failed
+    part-way is claimed again and retried on the next run.
+    """
+    claimed = await conn.fetchval("""
+        UPDATE sessions SET reaping_at = coalesce(reaping_at, now())
+        WHERE session_id = $1
+            AND (reaping_at IS NOT NULL OR last_accessed_at < now() - make_interval(secs => $2))
+        RETURNING session_id
+    """, session_id, ttl_seconds)
+    return claimed is not None
+
+
+def _deleted_count(status: str) -> int:
+    # asyncpg returns the command tag, e.g. "DELETE 500"
+    return int(status.rsplit(" ", 1)[-1])
+
+
+async def delete_session(conn, session_id: str, batch_size: int = 1000) -> int:
+    """Delete a claimed session's chunks ``batch_size`` rows per statement, then the session; returns chunks deleted."""
+    claimed = await conn.fetchval("SELECT reaping_at IS NOT NULL FROM sessions WHERE session_id = $1", session_id)
+    if not claimed:
+        raise SessionNotClaimed(f"Session {session_id} has not been claimed for reaping")
+    deleted = 0
+    while True:
+        status = await conn.execute("""
+            DELETE FROM documents
+            WHERE session_id = $1 AND id IN (
+                SELECT id FROM documents WHERE session_id = $1 LIMIT $2
+            )
+        """, session_id, batch_size)
+        count = _deleted_count(status)
+        deleted += count
+        if count < batch_size:
+            break
+    await conn.execute("DELETE FROM store_streams WHERE session_id = $1", session_id)
+    await conn.execute("DELETE FROM sessions WHERE session_id = $1", session_id)
+    return deleted
@@ -0,0 +1,150 @@
+"""Streaming ingestion for ``/store/stream``.
+
+The request body is NDJSON, one chunk record per line::
+
+    {"uri": "s3://bucket/session/doc.pdf", "chunk_id": 0, "text": "..."}
+    {"video_id": "abc123", "chunk_id": 0, "text": "..."}
+
+Lines are parsed as they arrive and collected into windows of ``window_size``
+records. Each window is embedded with one call and written with one INSERT, in the
+same transaction that advances the stream's ``committed_records`` in
+``store_streams``. Memory is bounded by one window whatever the session size, and a
+client that retries with the same ``stream_id`` after a failure resends the stream
+from the start: the records already committed are skipped, not stored twice.
+
+That transaction locks the stream's row (``FOR UPDATE``) and re-reads
+``committed_records`` before inserting, so two attempts on one ``stream_id`` that
+overlap (a retry sent while the first request is still running) each insert only
+the records the other has not committed.
+"""
+
+import json
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from vector_storage import embedding_column, embedding_type
+
+MAX_LINE_BYTES = 1024 * 1024
+
+
+class StreamChunk(BaseModel):
+    chunk_id: int
+    text: str
+    uri: Optional[str] = None
+    video_id: Optional[str] = None
+
+
+class StreamConflict(Exception):
+    """The ``stream_id`` is already in use for another session or tag."""
+
+
+async def iter_lines(body: AsyncIterator[bytes], max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[bytes]:
+    """Split a byte stream into non-empty lines without buffering more than one line."""
+    pending = b""
+    async for piece in body:
+        pending += piece
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+        if len(pending) > max_line_bytes:
+            raise ValueError(f"NDJSON line longer than {max_line_bytes} bytes")
+    if pending.strip():
+        yield pending
+
+
+async def get_progress(conn, stream_id: str) -> Optional[Dict]:
+    row = await conn.fetchrow("""
+        SELECT stream_id, session_id, tag, committed_records, completed, updated_at
+        FROM store_streams WHERE stream_id = $1
+    """, stream_id)
+    return dict(row) if row else None
+
+
+async def _start_stream(conn, stream_id: str, session_id: str, tag: str) -> int:
+    """Register the stream (or find it again on a retry); returns records already committed."""
+    await conn.execute("""
+        INSERT INTO store_streams (stream_id, session_id, tag) VALUES ($1, $2, $3)
+        ON CONFLICT (stream_id) DO NOTHING
+    """, stream_id, session_id, tag)
+    progress = await get_progress(conn, stream_id)
+    if (progress["session_id"], progress["tag"]) != (session_id, tag):
+        raise StreamConflict(f"Stream {stream_id} belongs to another session or tag")
+    return progress["committed_records"]
+
+
+async def _write_window(conn, stream_id: str, session_id: str, tag: str, window: List[StreamChunk],
+                        embeddings: List[List[float]], start: int, storage: str) -> int:
+    """Insert the records of ``window`` (stream positions ``start`` onwards) not yet committed; returns how many."""
+    async with conn.transaction():
+        committed = await conn.fetchval("""
+            SELECT committed_records FROM store_streams WHERE stream_id = $1 FOR UPDATE
+        """, stream_id)
+        skip = max(0, committed - start)  # committed meanwhile by an overlapping attempt
+        window, embeddings = window[skip:], embeddings[skip:]
+        if not window:
+            return 0
+        await conn.execute(f"""
+            INSERT INTO documents (content, chunk_id, tag, {embedding_column(storage)}, uri, video_id, session_id)
+            SELECT content, chunk_id, $6, embedding::{embedding_type(storage)}, uri, video_id, $7
+            FROM unnest($1::text[], $2::int[], $3::text[], $4::text[], $5::text[])
+                AS w(content, chunk_id, embedding, uri, video_id)
+        """,
+            [chunk.text for chunk in window],
+            [chunk.chunk_id for chunk in window],
+            [json.dumps(embedding) for embedding in embeddings],
+            [chunk.uri for chunk in window],
+            [chunk.video_id for chunk in window],
+            tag,
+            session_id,
+        )
+        await conn.execute("""
+            UPDATE store_streams SET committed_records = $2, updated_at = now() WHERE stream_id = $1
+        """, stream_id, start + skip + len(window))
+    return len(window)
+
+
+async def store_stream(conn, lines: AsyncIterator[bytes], session_id: str, tag: str, stream_id: str,
+                       embed: Callable[[List[str]], Awaitable[List[List[float]]]], window_size: int = 64,
+                       on_window: Optional[Callable[[int], None]] = None, storage: str = "vector") -> Dict:
+    """Store every record of ``lines`` not yet committed for ``stream_id``; returns a summary."""
+    already_committed = await _start_stream(conn, stream_id, session_id, tag)
+    position = 0
+    start = already_committed  # stream position of the current window
+    stored = 0
+    windows = 0
+    window: List[StreamChunk] = []
+
+    async def flush() -> None:
+        nonlocal start, stored, windows
+        embeddings = await embed([chunk.text for chunk in window])
+        inserted = await _write_window(conn, stream_id, session_id, tag, window, embeddings, start, storage)
+        start += len(window)
+        stored += inserted
+        if inserted:
+            windows += 1
+        window.clear()
+        if on_window is not None:
+            on_window(start)
+
+    async for line in lines:
+        position += 1
+        if position <= already_committed:
+            continue  # committed by an earlier attempt
+        window.append(StreamChunk.model_validate_json(line))
+        if len(window) >= window_size:
+            await flush()
+    if window:
+        await flush()
+
+    await conn.execute("""
+        UPDATE store_streams SET completed = true, updated_at = now() WHERE stream_id = $1
+    """, stream_id)
+    return {
+        "stream_id": stream_id,
+        "records": position,
+        "skipped": position - stored,
+        "stored": stored,
+        "windows": windows,
+    }
@@ -0,0 +1,80 @@
+"""How chunk embeddings are stored and searched (``EMBEDDING_STORAGE``).
+
+- ``vector``: full-precision ``vector(384)`` in ``embedding`` (4 bytes per dimension),
+  searched exactly.
+- ``halfvec``: half-precision ``halfvec(384)`` in ``embedding_half`` (2 bytes per
+  dimension). Searches first take ``top_k * overfetch`` candidates by Hamming distance
+  between binary-quantized embeddings (one bit per dimension, served by the HNSW
+  index on ``binary_quantize(embedding_half)``), then re-rank those candidates by
+  L2 distance on the half-precision vectors.
+
+The HNSW scan has to be allowed to return all candidates, and to keep scanning past
+other sessions' rows, so ``prefilter_settings`` is run on the connection first
+(pgvector >= 0.8 for ``hnsw.iterative_scan``).
+
+pgvector has no int8 vector type, so half precision is the compact scalar format.
+``database/migrations/003_compact_embeddings.sql`` backfills ``embedding_half`` for
+existing rows.
+"""
+
+DIMENSIONS = 384
+
+# mode -> (column, SQL type)
+STORAGE_MODES = {
+    "vector": ("embedding", f"vector({DIMENSIONS})"),
+    "halfvec": ("embedding_half", f"halfvec({DIMENSIONS})"),
+}
+
+RESULT_COLUMNS = "id, content, chunk_id, tag, uri, video_id, session_id"
+
+
+def storage_mode(name: str) -> str:
+    if name not in STORAGE_MODES:
+        raise ValueError(f"Unsupported EMBEDDING_STORAGE: {name} (expected one of {', '.join(STORAGE_MODES)})")
+    return name
+
+
+def embedding_column(storage: str) -> str:
+    return STORAGE_MODES[storage][0]
+
+
+def embedding_type(storage: str) -> str:
+    return STORAGE_MODES[storage][1]
+
+
+def candidate_count(top_k: int, overfetch: int) -> int:
+    return max(top_k, top_k * overfetch)
+
+
+def prefilter_settings(candidates: int) -> str:
+    # ef_search is capped at 1000 by pgvector
+    return f"SET hnsw.ef_search = {min(int(candidates), 1000)}; SET hnsw.iterative_scan = relaxed_order"
+
+
+def nearest_sql(storage: str, where: str, query: str, limit: str, candidates: str) -> str:
+    """A SELECT of the ``limit`` rows matching ``where`` nearest to ``query``, with a ``distance`` column.
+
+    ``query`` is a SQL expression of type ``embedding_type(storage)``; ``candidates``
+    (the over-fetch size) is only used, and so must only be bound, in ``halfvec`` mode.
+    """
+    if storage == "vector":
+        return f"""
+            SELECT {RESULT_COLUMNS}, embedding <-> {query} AS distance
+            FROM documents
+            WHERE {where}
+            ORDER BY embedding <-> {query}
+            LIMIT {limit}
+        """
+    # The prefilter expression must match the index definition to use it
+    return f"""
+        SELECT {RESULT_COLUMNS}, embedding_half <-> {query} AS distance
+        FROM (
+            SELECT {RESULT_COLUMNS}, embedding_half
+            FROM documents
+            WHERE {where}
+            ORDER BY binary_quantize(embedding_half)::bit({DIMENSIONS}) <~> binary_quantize({query})
+            LIMIT {candidates}
+        ) AS candidates
+        ORDER BY distance
+        LIMIT {limit}
+    """
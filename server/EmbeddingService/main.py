@@ -1,9 +1,13 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
+from typing import List, Union
 from sentence_transformers import SentenceTransformer
 import logging
 import uvicorn
 
+from common.observability import instrument_app, stage
+from common.logging_config import configure_logging, truncate
+
 app = FastAPI()
 model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
 
@@ -15,26 +19,25 @@ app.add_middleware(
     allow_methods=["*"],  # Allows all methods (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # Allows all headers
 )
+instrument_app(app, "embedding")
 # ========== Logging Setup ==========
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s",
-)
+configure_logging("embedding")
 logger = logging.getLogger(__name__)
 
 class TextInput(BaseModel):
-    inputs: str
+    inputs: Union[str, List[str]]  # a list is embedded as one batch, like the HF feature-extraction API
 
 @app.post("/embed")
 def generate_embedding(data: TextInput):
     try:
-        logger.info(f"Received input for embedding: {data.inputs}")
+        logger.debug("Received input for embedding: %s", truncate(data.inputs, 200))
         # Generate embedding using the model
-        embedding = model.encode(data.inputs).tolist()
-        logger.info(f"Generated embedding")
+        with stage("embed"):
+            embedding = model.encode(data.inputs).tolist()
+        logger.debug("Generated embedding")
         return embedding
     except Error as e:
-        logger.error(f"Error: {e}")
+        logger.error("Error: %s", e)
         return {"error": str(e)}
 
 # -------------- Run Server ----------------
@@ -1,22 +1,24 @@
 from fastapi import FastAPI, Body
-from typing import List, Dict, Any
-import boto3, tempfile, os, logging
-from youtube_transcript_api import YouTubeTranscriptApi
+from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+import asyncio, boto3, tempfile, os, logging, threading
 from pptx import Presentation
 from PyPDF2 import PdfReader
 import nltk
 import bisect
 from dotenv import load_dotenv
 load_dotenv()
+
+from common.observability import instrument_app, stage
+from common.logging_config import configure_logging
+from transcripts import TranscriptCache, TranscriptFetcher, load_source
+
 # Ensure punkt tokenizer is available
 nltk.download('punkt')
 from nltk.tokenize import sent_tokenize
 
 # ========== Logging Setup ==========
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s",
-)
+configure_logging("extractor")
 logger = logging.getLogger(__name__)
 
 # ========== FastAPI App ==========
@@ -36,8 +38,45 @@ app.add_middleware(
     allow_methods=["*"],  # Allows all methods (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # Allows all headers
 )
+instrument_app(app, "extractor")
+
+# Chunks of recently processed objects keyed by (s3_uri, etag), so unchanged objects skip download and parsing
+CHUNK_CACHE_SIZE = int(os.getenv("CHUNK_CACHE_SIZE", "256"))
+_chunk_cache: "OrderedDict[tuple, List[str]]" = OrderedDict()
+_chunk_cache_lock = threading.Lock()
+
+TRANSCRIPT_LANGUAGES = [lang.strip() for lang in os.getenv("TRANSCRIPT_LANGUAGES", "en").split(",") if lang.strip()]
+transcript_fetcher = TranscriptFetcher(
+    load_source(os.getenv("TRANSCRIPT_SOURCE")),
+    TranscriptCache(
+        os.getenv("TRANSCRIPT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "cleocog-transcripts")),
+        ttl_seconds=float(os.getenv("TRANSCRIPT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    ),
+    max_concurrency=int(os.getenv("TRANSCRIPT_CONCURRENCY", "4")),
+    retries=int(os.getenv("TRANSCRIPT_RETRIES", "3")),
+    backoff_seconds=float(os.getenv("TRANSCRIPT_BACKOFF_SECONDS", "0.5"))
+)
+
 # ========== Helpers ==========
 
+def get_cached_chunks(s3_uri: str, etag: Optional[str]) -> Optional[List[str]]:
+    if not etag:
+        return None
+    with _chunk_cache_lock:
+        chunks = _chunk_cache.get((s3_uri, etag))
+        if chunks is not None:
+            _chunk_cache.move_to_end((s3_uri, etag))
+        return chunks
+
+def cache_chunks(s3_uri: str, etag: Optional[str], chunks: List[str]) -> None:
+    if not etag or CHUNK_CACHE_SIZE <= 0:
+        return
+    with _chunk_cache_lock:
+        _chunk_cache[(s3_uri, etag)] = chunks
+        _chunk_cache.move_to_end((s3_uri, etag))
+        while len(_chunk_cache) > CHUNK_CACHE_SIZE:
+            _chunk_cache.popitem(last=False)
+
 def chunk_text(text: str, max_tokens=300, overlap=50) -> List[str]:
     sentences = sent_tokenize(text)
     chunks = []
@@ -69,90 +108,114 @@ def chunk_text(text: str, max_tokens=300, overlap=50) -> List[str]:
 
 
 def parse_pdf(file_path: str) -> str:
-    logger.info(f"Parsing PDF: {file_path}")
+    logger.debug("Parsing PDF: %s", file_path)
     reader = PdfReader(file_path)
     return "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
 
 def parse_pptx(file_path: str) -> str:
-    logger.info(f"Parsing PPTX: {file_path}")
+    logger.debug("Parsing PPTX: %s", file_path)
     prs = Presentation(file_path)
     return "\n".join([
         shape.text for slide in prs.slides for shape in slide.shapes if hasattr(shape, "text")
     ])
 
-# ========== Main API ==========
-
-@app.post("/process")
-async def process_docs(payload: Dict[str, List[str]] = Body(...)) -> Dict[str, Any]:
-    documents = payload.get("documents", [])
-    videos = payload.get("youtube_videos", [])
-    results = {"document_chunks": [], "youtube_chunks": [], "errors": []}
-
-    # S3 documents
+def process_documents(documents: List[str], manifest: Dict[str, Any], results: Dict[str, Any]) -> None:
     for s3_uri in documents:
+        etag = (manifest.get(s3_uri) or {}).get("etag")
+        cached = get_cached_chunks(s3_uri, etag)
+        if cached is not None:
+            logger.debug("Skipping unchanged S3 document: %s", s3_uri)
+            results["document_chunks"].append({"s3_uri": s3_uri, "chunks": cached})
+            results["unchanged"].append(s3_uri)
+            continue
+
+        tmp = None
         try:
-            logger.info(f"Processing S3 document: {s3_uri}")
+            logger.info("Processing S3 document: %s", s3_uri)
             if not s3_uri.startswith("s3://"):
                 raise ValueError(f"Invalid S3 URI: {s3_uri}")
             bucket, key = s3_uri[5:].split("/", 1)
             ext = os.path.splitext(key)[1][1:].lower()
 
             with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                s3.download_fileobj(bucket, key, tmp)
+                with stage("s3_download"):
+                    s3.download_fileobj(bucket, key, tmp)
                 tmp.flush()
-                logger.info(f"Downloaded S3 file: {s3_uri}")
-
-                if ext == "pdf":
-                    text = parse_pdf(tmp.name)
-                elif ext == "pptx":
-                    text = parse_pptx(tmp.name)
-                elif ext == "txt":
-                    with open(tmp.name, 'r') as f:
-                        text = f.read()
-                    logger.info(f"Read plain text file: {s3_uri}")
-                else:
-                    raise ValueError(f"Unsupported file type: {ext}")
-
-                chunks = chunk_text(text)
+                logger.debug("Downloaded S3 file: %s", s3_uri)
+
+                with stage("parse"):
+                    if ext == "pdf":
+                        text = parse_pdf(tmp.name)
+                    elif ext == "pptx":
+                        text = parse_pptx(tmp.name)
+                    elif ext == "txt":
+                        with open(tmp.name, 'r') as f:
+                            text = f.read()
+                        logger.debug("Read plain text file: %s", s3_uri)
+                    else:
+                        raise ValueError(f"Unsupported file type: {ext}")
+
+                with stage("chunk"):
+                    chunks = chunk_text(text)
+                cache_chunks(s3_uri, etag, chunks)
                 results["document_chunks"].append({
                     "s3_uri": s3_uri,
                     "chunks": chunks
                 })
-                logger.info(f"Document chunking complete for: {s3_uri}")
+                logger.info("Document chunking complete for: %s", s3_uri, extra={"chunks": len(chunks)})
         except Exception as e:
-            logger.error(f"Error processing document {s3_uri}: {e}")
+            logger.error("Error processing document %s: %s", s3_uri, e)
             results["errors"].append({"document": s3_uri, "error": str(e)})
         finally:
-            if os.path.exists(tmp.name):
+            if tmp is not None and os.path.exists(tmp.name):
                 os.unlink(tmp.name)
-                logger.info(f"Temporary file deleted: {tmp.name}")
+                logger.debug("Temporary file deleted: %s", tmp.name)
 
-    # YouTube videos
-    for vid in videos:
-        try:
-            logger.info(f"Fetching transcript for YouTube video: {vid}")
-            transcript = YouTubeTranscriptApi.get_transcript(vid)
-            full_text = " ".join([seg["text"] for seg in transcript])
-            chunks = chunk_text(full_text)
-            results["youtube_chunks"].append({
-                "video_id": vid,
-                "chunks": chunks
-            })
-            logger.info(f"YouTube transcript processed: {vid}")
-        except Exception as e:
-            logger.error(f"Error processing video {vid}: {e}")
-            results["errors"].append({"video_id": vid, "error": str(e)})
+# ========== Main API ==========
+
+@app.post("/process")
+async def process_docs(payload: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
+    documents = payload.get("documents", [])
+    videos = payload.get("youtube_videos", [])
+    languages = payload.get("youtube_languages") or TRANSCRIPT_LANGUAGES
+    # Optional {s3_uri: {"etag": ..., "size": ...}} from BackendService's session manifest
+    manifest = payload.get("manifest") or {}
+    results = {"document_chunks": [], "youtube_chunks": [], "errors": [], "unchanged": []}
+
+    # Transcripts are network-bound: fetch them while the S3 documents are downloaded and parsed
+    logger.info("Processing %d S3 documents and %d YouTube videos", len(documents), len(videos))
+    transcripts, _ = await asyncio.gather(
+        transcript_fetcher.fetch_many(videos, languages),
+        asyncio.to_thread(process_documents, documents, manifest, results)
+    )
+
+    for fetched in transcripts:
+        vid = fetched["video_id"]
+        timing = {"seconds": round(fetched["seconds"], 3), "attempts": fetched["attempts"], "cached": fetched["cached"]}
+        if "error" in fetched:
+            logger.error("Error processing video %s: %s", vid, fetched["error"])
+            results["errors"].append({"video_id": vid, "error": fetched["error"], **timing})
+            continue
+        full_text = " ".join([seg["text"] for seg in fetched["segments"]])
+        with stage("chunk"):
+            chunks = await asyncio.to_thread(chunk_text, full_text)
+        results["youtube_chunks"].append({
+            "video_id": vid,
+            "chunks": chunks,
+            **timing
+        })
+        logger.info("YouTube transcript processed: %s", vid, extra={"chunks": len(chunks), **timing})
 
     return results
 
 @app.get("/health")
 async def health_check() -> Dict[str, str]:
-    logger.info("Health check requested")
+    logger.debug("Health check requested")
     return {"status": "ok"}
 
 @app.get("/")
 async def root() -> Dict[str, str]:
-    logger.info("Root endpoint hit")
+    logger.debug("Root endpoint hit")
     return {"message": "Welcome to the Extractor Service!"}
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+"""YouTube transcript fetching: concurrent, retried and cached on disk.
+
+``TranscriptFetcher.fetch_many`` fetches every video at once, at most
+``max_concurrency`` at a time across all callers (the fetcher is shared by the
+service's requests), retrying failures with exponential backoff and jitter.
+Errors that retrying can't fix (transcripts disabled, no transcript in the
+requested languages, unavailable video) fail immediately. Transcripts are cached
+as JSON files keyed by video id and languages for ``ttl_seconds``.
+
+The source is pluggable: anything with ``fetch(video_id, languages) -> [segment, ...]``
+where a segment is a dict with ``text``. ``load_source`` builds it from a
+``"module:attribute"`` spec (``TRANSCRIPT_SOURCE``), which is how tests plug in a
+local fake; the default is ``YouTubeTranscriptSource``.
+"""
+
+import asyncio
+import hashlib
+import importlib
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from common.observability import stage
+
+logger = logging.getLogger(__name__)
+
+Segments = List[Dict[str, Any]]
+
+# youtube_transcript_api exceptions (matched by name, so the library is only imported by its source)
+NON_RETRYABLE_ERRORS = {
+    "TranscriptsDisabled", "NoTranscriptFound", "NoTranscriptAvailable", "VideoUnavailable",
+    "InvalidVideoId", "AgeRestricted",
+}
+
+
+class TranscriptUnavailable(Exception):
+    """Raised by a source when retrying can't help."""
+
+
+class YouTubeTranscriptSource:
+    def fetch(self, video_id: str, languages: Sequence[str]) -> Segments:
+        from youtube_transcript_api import YouTubeTranscriptApi
+
+        if hasattr(YouTubeTranscriptApi, "get_transcript"):  # before youtube-transcript-api 1.0
+            return YouTubeTranscriptApi.get_transcript(video_id, languages=list(languages))
+        return YouTubeTranscriptApi().fetch(video_id, languages=list(languages)).to_raw_data()
+
+
+def load_source(spec: Optional[str]):
+    """Instantiate the transcript source named by ``"module:attribute"``, or the YouTube source."""
+    if not spec:
+        return YouTubeTranscriptSource()
+    module_name, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)()
+
+
+def is_retryable(error: Exception) -> bool:
+    return not isinstance(error, TranscriptUnavailable) and type(error).__name__ not in NON_RETRYABLE_ERRORS
+
+
+class TranscriptCache:
+    """One JSON file per (video id, languages), valid for ``ttl_seconds`` after it was written."""
+
+    def __init__(self, directory: str, ttl_seconds: float, clock: Callable[[], float] = time.time):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+
+    def _path(self, video_id: str, languages: Sequence[str]) -> str:
+        key = f"{video_id}.{'-'.join(languages) or 'default'}"
+        if not re.fullmatch(r"[A-Za-z0-9_.-]+", key):
+            key = hashlib.sha256(key.encode()).hexdigest()  # never let a video id pick the path
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, video_id: str, languages: Sequence[str]) -> Optional[Segments]:
+        if self.ttl_seconds <= 0:
+            return None
+        try:
+            with open(self._path(video_id, languages)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._clock() - entry.get("fetched_at", 0) > self.ttl_seconds:
+            return None
+        return entry.get("segments")
+
+    def put(self, video_id: str, languages: Sequence[str], segments: Segments) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(video_id, languages)
+        # Write then rename, so a concurrent reader never sees a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"video_id": video_id, "fetched_at": self._clock(), "segments": segments}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.warning("Could not cache transcript for %s", video_id, exc_info=True)
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+
+class TranscriptFetcher:
+    def __init__(self, source, cache: TranscriptCache, max_concurrency: int = 4, retries: int = 3,
+                 backoff_seconds: float = 0.5, max_backoff_seconds: float = 8.0,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        self.source = source
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._sleep = sleep
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number ``attempt`` (1-based): exponential, capped, with jitter."""
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def fetch(self, video_id: str, languages: Sequence[str]) -> Dict[str, Any]:
+        """``{"video_id", "segments" or "error", "seconds", "attempts", "cached"}`` for one video."""
+        start = time.perf_counter()
+        result: Dict[str, Any] = {"video_id": video_id, "attempts": 0, "cached": False}
+        segments = await asyncio.to_thread(self.cache.get, video_id, languages)
+        if segments is not None:
+            result.update(segments=segments, cached=True)
+        else:
+            async with self._semaphore:
+                for attempt in range(1, self.retries + 2):
+                    result["attempts"] = attempt
+                    try:
+                        segments = await asyncio.to_thread(self.source.fetch, video_id, languages)
+                        break
+                    except Exception as e:
+                        if not is_retryable(e) or attempt > self.retries:
+                            logger.warning("Transcript for %s failed after %d attempts: %s", video_id, attempt, e)
+                            result["error"] = str(e) or type(e).__name__
+                            break
+                        delay = self.backoff(attempt)
+                        logger.info("Transcript for %s failed (%s); retrying in %.2fs", video_id, e, delay)
+                        await self._sleep(delay)
+            if segments is not None:
+                result["segments"] = segments
+                await asyncio.to_thread(self.cache.put, video_id, languages, segments)
+        result["seconds"] = time.perf_counter() - start
+        return result
+
+    async def fetch_many(self, video_ids: Sequence[str], languages: Sequence[str]) -> List[Dict[str, Any]]:
+        """Fetch all videos concurrently (bounded); results are in input order."""
+        if not video_ids:
+            return []
+        # One stage for the whole batch: per-video timings would overlap and add up past the wall time
+        with stage("youtube_transcript"):
+            return list(await asyncio.gather(*(self.fetch(vid, languages) for vid in video_ids)))
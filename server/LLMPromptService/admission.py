@@ -0,0 +1,233 @@
+"""Provider-aware admission control for ``/generate``.
+
+Each provider gets two token buckets, requests per minute and (estimated) tokens per
+minute. Requests that can't be admitted immediately wait in a bounded queue ordered
+by priority class, then arrival. A request is rejected up front (HTTP 429 with
+``Retry-After``) when the queue is full or when the wait predicted from the buckets
+and the work queued ahead of it would exceed its deadline.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Callable, Dict, List, Optional
+
+from common.observability import REGISTRY
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+QUEUE_DEPTH = REGISTRY.gauge(
+    "cleocog_llm_queue_depth", "Generation requests waiting for provider capacity.", ("provider", "priority")
+)
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "cleocog_llm_queue_wait_seconds", "Time a generation request waited for admission.", ("provider", "priority")
+)
+REJECTED = REGISTRY.counter(
+    "cleocog_llm_rejected", "Generation requests rejected by admission control.", ("provider", "reason")
+)
+
+
+def estimate_tokens(prompt: str, max_tokens: Optional[int]) -> int:
+    """Rough token estimate (~4 characters per token) plus the completion budget."""
+    return math.ceil(len(prompt) / 4) + (max_tokens or 0)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Request rejected ({reason}); retry after {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """``capacity`` tokens refilled continuously at ``capacity`` per minute; 0 means unlimited."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._clock = clock
+        self.tokens = self.capacity
+        self._updated = clock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def clamp(self, amount: float) -> float:
+        # A request larger than the whole bucket would never fit; let it drain a full bucket instead
+        return amount if self.unlimited else min(amount, self.capacity)
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until ``amount`` tokens are available (0 if they are now)."""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        missing = self.clamp(amount) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def time_until_all(self, amounts: List[float]) -> float:
+        """Seconds until requests for ``amounts`` have all been served, one after another.
+
+        Each request is clamped on its own; their total is not, as it can take several
+        refills of the bucket.
+        """
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        missing = sum(self.clamp(amount) for amount in amounts) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float) -> None:
+        if not self.unlimited:
+            self._refill()
+            self.tokens -= self.clamp(amount)
+
+    def refund(self, amount: float) -> None:
+        """Return tokens consumed for a request that was not served after all."""
+        if not self.unlimited:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + self.clamp(amount))
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "tokens", "future")
+
+    def __init__(self, priority: int, seq: int, tokens: int, future: "asyncio.Future"):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.future = future
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class AdmissionController:
+    """Admission for one provider. All methods run on the event loop; no locking needed."""
+
+    def __init__(self, provider: str, requests_per_minute: float, tokens_per_minute: float,
+                 max_queue: int = 100, clock: Callable[[], float] = time.monotonic):
+        self.provider = provider
+        self.requests = TokenBucket(requests_per_minute, clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock)
+        self.max_queue = max_queue
+        self._clock = clock
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._pump_task: Optional["asyncio.Task"] = None
+
+    @property
+    def depth(self) -> int:
+        return sum(1 for waiter in self._queue if not waiter.future.done())
+
+    def predicted_wait(self, tokens: int, priority: int) -> float:
+        """Wait implied by the buckets for this request plus everything queued ahead of it."""
+        ahead = [w for w in self._queue if w.priority <= priority and not w.future.done()]
+        return max(
+            self.requests.time_until_all([1] * (len(ahead) + 1)),
+            self.tokens.time_until_all([w.tokens for w in ahead] + [tokens]),
+        )
+
+    def _admit_now(self, tokens: int) -> bool:
+        if self.requests.time_until(1) == 0 and self.tokens.time_until(tokens) == 0:
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+            return True
+        return False
+
+    async def acquire(self, tokens: int, priority: str = "interactive", deadline: float = 10.0) -> float:
+        """Wait for capacity; returns the seconds waited or raises ``AdmissionRejected``."""
+        level = PRIORITIES.get(priority, PRIORITIES["interactive"])
+        start = self._clock()
+        if not any(w.priority <= level and not w.future.done() for w in self._queue) and self._admit_now(tokens):
+            QUEUE_WAIT_SECONDS.observe(0.0, provider=self.provider, priority=priority)
+            return 0.0
+
+        if self.depth >= self.max_queue:
+            REJECTED.inc(provider=self.provider, reason="queue_full")
+            raise AdmissionRejected("queue_full", self.predicted_wait(tokens, level))
+        predicted = self.predicted_wait(tokens, level)
+        if predicted > deadline:
+            REJECTED.inc(provider=self.provider, reason="deadline")
+            raise AdmissionRejected("deadline", predicted)
+
+        waiter = _Waiter(level, next(self._seq), tokens, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, waiter)
+        QUEUE_DEPTH.inc(provider=self.provider, priority=priority)
+        self._ensure_pump()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=deadline)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The pump admitted it just as the deadline passed; give its capacity back
+                self.requests.refund(1)
+                self.tokens.refund(tokens)
+                if self._queue:
+                    self._ensure_pump()
+            REJECTED.inc(provider=self.provider, reason="deadline")
+            raise AdmissionRejected("deadline", self.predicted_wait(tokens, level))
+        finally:
+            if not waiter.future.done():
+                waiter.future.cancel()  # the pump skips cancelled waiters
+            QUEUE_DEPTH.dec(provider=self.provider, priority=priority)
+        waited = self._clock() - start
+        QUEUE_WAIT_SECONDS.observe(waited, provider=self.provider, priority=priority)
+        return waited
+
+    def _ensure_pump(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.ensure_future(self._pump())
+
+    async def _pump(self) -> None:
+        """Admit queued requests head-first as the buckets refill."""
+        while self._queue:
+            head = self._queue[0]
+            if head.future.done():
+                heapq.heappop(self._queue)
+                continue
+            wait = max(self.requests.time_until(1), self.tokens.time_until(head.tokens))
+            if wait <= 0:
+                heapq.heappop(self._queue)
+                self.requests.consume(1)
+                self.tokens.consume(head.tokens)
+                head.future.set_result(None)
+                continue
+            # Sleep until the head fits, or until a new (possibly higher-priority) request arrives
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+
+class AdmissionRegistry:
+    """One ``AdmissionController`` per provider, with limits from the environment."""
+
+    def __init__(self, getenv: Callable[[str, Optional[str]], Optional[str]]):
+        self._getenv = getenv
+        self._controllers: Dict[str, AdmissionController] = {}
+
+    def _limit(self, name: str, provider: str, default: str) -> float:
+        return float(self._getenv(f"{name}_{provider.upper()}", None) or self._getenv(name, default))
+
+    def get(self, provider: str) -> AdmissionController:
+        controller = self._controllers.get(provider)
+        if controller is None:
+            controller = self._controllers[provider] = AdmissionController(
+                provider,
+                requests_per_minute=self._limit("LLM_RPM", provider, "500"),
+                tokens_per_minute=self._limit("LLM_TPM", provider, "100000"),
+                max_queue=int(self._limit("LLM_MAX_QUEUE", provider, "100")),
+            )
+        return controller
@@ -0,0 +1,96 @@
+"""Single-flight coalescing and an exact-match TTL cache for generation requests.
+
+Identical requests (same provider, model, prompt, temperature and max_tokens) that
+arrive while one is already in flight wait for that call instead of starting their
+own. Results of deterministic requests are also kept in a bounded TTL cache.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+HIT = "hit"
+COALESCED = "coalesced"
+MISS = "miss"
+BYPASS = "bypass"
+
+
+def request_key(provider: str, model: str, prompt: str, temperature: Optional[float], max_tokens: Optional[int]) -> str:
+    payload = json.dumps([provider, model, prompt, temperature, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire ``ttl_seconds`` after being stored."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if self._clock() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (self._clock(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class RequestCoalescer:
+    """Runs at most one call per key at a time and caches results the caller marks cacheable.
+
+    Everything runs on one event loop, so no locking is needed around the dicts.
+    """
+
+    def __init__(self, cache: TTLCache):
+        self.cache = cache
+        self._in_flight: Dict[str, "asyncio.Future"] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    async def run(self, key: str, call: Callable[[], Awaitable[Any]], cacheable: bool = False,
+                  use_cache: bool = True) -> Tuple[Any, str]:
+        """Return ``(result, outcome)`` where outcome is hit, coalesced, miss or bypass."""
+        if cacheable and use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached, HIT
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            # Shield so a disconnecting follower doesn't cancel the shared call
+            return await asyncio.shield(task), COALESCED
+
+        task = asyncio.ensure_future(call())
+        self._in_flight[key] = task
+
+        def finished(done: "asyncio.Future") -> None:
+            if self._in_flight.get(key) is done:
+                del self._in_flight[key]
+            # Cache from the callback so the result is kept even if the caller went away
+            if cacheable and use_cache and not done.cancelled() and done.exception() is None:
+                self.cache.put(key, done.result())
+
+        task.add_done_callback(finished)
+        return await asyncio.shield(task), MISS if use_cache else BYPASS
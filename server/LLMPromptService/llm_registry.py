@@ -0,0 +1,153 @@
+"""Process-wide LLM clients, one per provider for its configured model.
+
+The model comes from configuration only (``OPENAI_MODEL``, ...), never from the
+request, so the registry holds at most one client per provider. Clients are built on
+first use and then reused by every request, together with
+their HTTP connection pools, so a ``/generate`` call no longer pays for a new client,
+new sessions and a new TLS handshake. Per-request generation settings are bound
+onto the shared client with ``generation_kwargs`` instead of building a new one.
+
+Provider SDKs are imported inside their builders: importing this module costs
+nothing, and a deployment only ever loads the one ``LLM_PROVIDER`` it uses.
+On Lambda, ``warm()`` runs during init so the import and client construction are
+not paid by the first invocation.
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODELS = {
+    "openai": ("OPENAI_MODEL", "gpt-3.5-turbo"),
+    "anthropic": ("ANTHROPIC_MODEL", "claude-2"),
+    "google": ("GOOGLE_MODEL", "gemini-pro"),
+    "deepseek": ("DEEPSEEK_MODEL", "deepseek-chat"),
+    "bedrock": ("BEDROCK_MODEL", "anthropic.claude-v2"),
+}
+
+_clients: Dict[Tuple[str, str], Any] = {}
+_lock = threading.Lock()
+_http_clients: Optional[Tuple[Any, Any]] = None
+
+
+def current_provider() -> str:
+    return os.getenv("LLM_PROVIDER", "openai").lower()
+
+
+def default_model(provider: str) -> str:
+    if provider not in DEFAULT_MODELS:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+    env_name, default = DEFAULT_MODELS[provider]
+    return os.getenv(env_name, default)
+
+
+def _pooled_http_clients():
+    """Keep-alive pools shared by the OpenAI-compatible clients (openai, deepseek)."""
+    global _http_clients
+    if _http_clients is None:
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10")),
+            keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60")),
+        )
+        timeout = httpx.Timeout(float(os.getenv("LLM_TIMEOUT", "60")), connect=10.0)
+        _http_clients = (
+            httpx.Client(limits=limits, timeout=timeout),
+            httpx.AsyncClient(limits=limits, timeout=timeout),
+        )
+    return _http_clients
+
+
+def _build_openai(model: str):
+    from langchain_openai import ChatOpenAI
+
+    http_client, http_async_client = _pooled_http_clients()
+    return ChatOpenAI(model=model, http_client=http_client, http_async_client=http_async_client)
+
+
+def _build_deepseek(model: str):
+    from langchain_openai import ChatOpenAI
+
+    http_client, http_async_client = _pooled_http_clients()
+    return ChatOpenAI(
+        model=model,
+        openai_api_base=os.getenv("DEEPSEEK_API_BASE", "https://api.deepseek.com/v1"),
+        openai_api_key=os.getenv("DEEPSEEK_API_KEY"),
+        http_client=http_client,
+        http_async_client=http_async_client
+    )
+
+
+def _build_anthropic(model: str):
+    from langchain_community.chat_models import ChatAnthropic
+
+    return ChatAnthropic(model=model)
+
+
+def _build_google(model: str):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(model=model)
+
+
+def _build_bedrock(model: str):
+    from langchain_aws import ChatBedrock
+
+    return ChatBedrock(model_id=model, region_name=os.getenv("AWS_REGION", "us-west-2"))
+
+
+BUILDERS: Dict[str, Callable[[str], Any]] = {
+    "openai": _build_openai,
+    "deepseek": _build_deepseek,
+    "anthropic": _build_anthropic,
+    "google": _build_google,
+    "bedrock": _build_bedrock,
+}
+
+
+def generation_kwargs(provider: str, temperature: Optional[float], max_tokens: Optional[int]) -> Dict[str, Any]:
+    """Per-call generation settings in the keyword form each provider's client accepts."""
+    if provider == "google":
+        config = {}
+        if temperature is not None:
+            config["temperature"] = temperature
+        if max_tokens is not None:
+            config["max_output_tokens"] = max_tokens
+        return {"generation_config": config} if config else {}
+    kwargs: Dict[str, Any] = {}
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    if max_tokens is not None:
+        kwargs["max_tokens_to_sample" if provider == "anthropic" else "max_tokens"] = max_tokens
+    return kwargs
+
+
+def get_client(provider: Optional[str] = None):
+    """Return the shared client for ``provider`` and its configured model, building it on first use."""
+    provider = (provider or current_provider()).lower()
+    if provider not in BUILDERS:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+    model = default_model(provider)
+    key = (provider, model)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                logger.info("Initializing LLM client", extra={"provider": provider, "model": model})
+                client = _clients[key] = BUILDERS[provider](model)
+    return client
+
+
+def warm() -> None:
+    """Import the configured provider and build its default client ahead of the first request."""
+    try:
+        get_client()
+    except Exception:
+        # A broken configuration should surface on /generate, not crash the container at init
+        logger.exception("LLM client warm-up failed")
@@ -1,15 +1,16 @@
 import os
+import math
 import logging
 from typing import Optional
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from pydantic import BaseModel
 from mangum import Mangum
 
-# LLM imports
-from langchain_openai import ChatOpenAI  # Reusing OpenAI-compatible client
-from langchain_community.chat_models import ChatOpenAI, ChatAnthropic
-from langchain_google_genai import ChatGoogleGenerativeAI
-
+from common.observability import REGISTRY, instrument_app, stage
+from common.logging_config import configure_logging, truncate
+import llm_registry
+from coalescing import RequestCoalescer, TTLCache, request_key
+from admission import PRIORITIES, AdmissionRegistry, AdmissionRejected, estimate_tokens
 
 
 # Load environment variables in local development
@@ -21,16 +22,13 @@ if "AWS_LAMBDA_FUNCTION_NAME" not in os.environ:
         pass  # dotenv not installed
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s"
-)
+configure_logging("llm")
 logger = logging.getLogger(__name__)
 
 def get_env_var(name: str, default: Optional[str] = None) -> str:
     """Retrieve environment variables safely for both local and AWS Lambda environments."""
     value = os.environ.get(name, default)
-    logger.debug(f"Environment variable {name} resolved to: {value}")
+    logger.debug("Environment variable %s resolved", name)
     return value
 
 class LLMRequest(BaseModel):
@@ -51,55 +49,97 @@ app.add_middleware(
     allow_methods=["*"],  # Allows all methods (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # Allows all headers
 )
+instrument_app(app, "llm")
+
+# Import the provider SDK and build its client during Lambda init instead of on the first invocation
+if "AWS_LAMBDA_FUNCTION_NAME" in os.environ and get_env_var("LLM_WARMUP", "1") != "0":
+    llm_registry.warm()
+
+# Identical in-flight requests share one provider call; deterministic ones are cached
+LLM_CACHE_SIZE = int(get_env_var("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL_SECONDS = float(get_env_var("LLM_CACHE_TTL_SECONDS", "600"))
+LLM_CACHE_MAX_TEMPERATURE = float(get_env_var("LLM_CACHE_MAX_TEMPERATURE", "0"))
+CACHE_HEADER = "X-LLM-Cache"
+
+coalescer = RequestCoalescer(TTLCache(LLM_CACHE_SIZE, LLM_CACHE_TTL_SECONDS))
+LLM_CACHE_REQUESTS = REGISTRY.counter(
+    "cleocog_llm_cache_requests",
+    "Generation requests by cache outcome (hit, coalesced, miss, bypass).",
+    ("outcome",),
+)
+
+def cache_opted_out(http_request: Request) -> bool:
+    """Clients skip the cache with ``X-LLM-Cache: bypass`` or ``Cache-Control: no-cache``/``no-store``."""
+    if http_request.headers.get(CACHE_HEADER, "").lower() == "bypass":
+        return True
+    cache_control = http_request.headers.get("Cache-Control", "").lower()
+    return "no-cache" in cache_control or "no-store" in cache_control
+
+# Per-provider RPM/TPM limits with a bounded priority queue (LLM_RPM[_<PROVIDER>], LLM_TPM[_<PROVIDER>], LLM_MAX_QUEUE)
+PRIORITY_HEADER = "X-Priority"
+DEADLINE_HEADER = "X-Queue-Deadline"
+DEFAULT_DEADLINES = {
+    "interactive": float(get_env_var("LLM_DEADLINE_INTERACTIVE", "10")),
+    "batch": float(get_env_var("LLM_DEADLINE_BATCH", "60")),
+}
+
+admission = AdmissionRegistry(get_env_var)
+
+def admission_params(http_request: Request):
+    """Priority class and queue deadline (seconds) from the request headers."""
+    priority = http_request.headers.get(PRIORITY_HEADER, "interactive").lower()
+    if priority not in PRIORITIES:
+        priority = "interactive"
+    try:
+        deadline = float(http_request.headers[DEADLINE_HEADER])
+    except (KeyError, ValueError):
+        deadline = DEFAULT_DEADLINES[priority]
+    return priority, deadline
+
 def get_llm():
-    llm_provider = get_env_var("LLM_PROVIDER", "openai").lower()
-    logger.info(f"Initializing LLM provider: {llm_provider}")
-
-    if llm_provider == "openai":
-        return ChatOpenAI(
-            model=get_env_var("OPENAI_MODEL", "gpt-3.5-turbo"),
-            temperature=0.7,
-            max_tokens=500
-        )
-    elif llm_provider == "anthropic":
-        return ChatAnthropic(
-            model=get_env_var("ANTHROPIC_MODEL", "claude-2"),
-            temperature=0.7,
-            max_tokens=500
-        )
-    elif llm_provider == "google":
-        return ChatGoogleGenerativeAI(
-            model=get_env_var("GOOGLE_MODEL", "gemini-pro"),
-            temperature=0.7
-        )
-    elif llm_provider == "bedrock":
-        return Bedrock(
-            model_id=get_env_var("BEDROCK_MODEL", "anthropic.claude-v2"),
-            region_name=get_env_var("AWS_REGION", "us-west-2"),
-            temperature=0.7,
-            max_tokens_to_sample=500
-        )
-    elif llm_provider == "deepseek":
-        return ChatOpenAI(
-            model=get_env_var("DEEPSEEK_MODEL", "deepseek-chat"),
-            openai_api_base=get_env_var("DEEPSEEK_API_BASE", "https://api.deepseek.com/v1"),
-            openai_api_key=get_env_var("DEEPSEEK_API_KEY"),
-            temperature=0.7,
-            max_tokens=500
-        )
-    else:
-        logger.error(f"Unsupported LLM provider: {llm_provider}")
-        raise ValueError(f"Unsupported LLM provider: {llm_provider}")
+    """Shared client for the configured provider and model; built once."""
+    return llm_registry.get_client(get_env_var("LLM_PROVIDER", "openai"))
 
 @app.post("/generate", response_model=LLMResponse)
-async def generate_text(request: LLMRequest):
-    logger.info(f"Received generation request with prompt: {request.prompt[:1000]}...")  # Log only first 100 chars
+async def generate_text(request: LLMRequest, http_request: Request, response: Response):
+    logger.info(
+        "Received generation request with prompt: %s", truncate(request.prompt, 200),
+        extra={"prompt_chars": len(request.prompt)}
+    )
 
     try:
-        llm = get_llm()
-        response = await llm.ainvoke(request.prompt)
-        logger.info(f"Generated text successfully")
-        return {"generated_text": response.content}
+        provider = get_env_var("LLM_PROVIDER", "openai").lower()
+        model = llm_registry.default_model(provider)
+        llm = get_llm().bind(
+            **llm_registry.generation_kwargs(provider, request.temperature, request.max_tokens)
+        )
+
+        priority, deadline = admission_params(http_request)
+
+        async def call():
+            with stage("queue"):
+                await admission.get(provider).acquire(
+                    estimate_tokens(request.prompt, request.max_tokens), priority, deadline
+                )
+            with stage("llm"):
+                return (await llm.ainvoke(request.prompt)).content
+
+        key = request_key(provider, model, request.prompt, request.temperature, request.max_tokens)
+        cacheable = request.temperature is not None and request.temperature <= LLM_CACHE_MAX_TEMPERATURE
+        generated_text, outcome = await coalescer.run(
+            key, call, cacheable=cacheable, use_cache=not cache_opted_out(http_request)
+        )
+        LLM_CACHE_REQUESTS.inc(outcome=outcome)
+        response.headers[CACHE_HEADER] = outcome
+        logger.info("Generated text successfully", extra={"cache": outcome})
+        return {"generated_text": generated_text}
+    except AdmissionRejected as e:
+        logger.warning("Generation request rejected: %s", e, extra={"reason": e.reason, "priority": priority})
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
     except Exception as e:
         logger.exception("Failed to generate text")
         raise HTTPException(status_code=500, detail=str(e))
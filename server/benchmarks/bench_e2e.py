@@ -0,0 +1,365 @@
+"""End-to-end benchmark of the whole stack, offline, against local stand-ins.
+
+Starts BackendService, ExtractorService, DBService, LLMPromptService and (with
+``--embedding service``) EmbeddingService as local uvicorn processes, wired to:
+
+- an in-process moto S3 server (or ``--s3-endpoint`` for MinIO/LocalStack),
+- the local Postgres + pgvector from ``database/docker-compose.yml`` (``POSTGRES_*``),
+- ``fake_embeddings.py`` in place of the Hugging Face API (or the real EmbeddingService),
+- ``fake_openai.py`` in place of the LLM provider.
+
+It then ingests the PDFs in ``database/data/test-data`` into ``--sessions`` sessions
+(``--copies`` uploads of every file per session), replays a ``/query`` workload at
+``--concurrency``, and reports end-to-end and per-stage (``Server-Timing``) p50/p99
+plus ingested docs/sec. Results are written as JSON; ``--compare`` checks them
+against an earlier run and exits non-zero on a regression.
+
+    cd database && docker compose up -d
+    pip install -r benchmarks/requirements.txt   # plus each service's requirements
+    python benchmarks/bench_e2e.py --sessions 4 --copies 5 --requests 500 --concurrency 16
+    python benchmarks/bench_e2e.py --compare results/e2e-baseline.json
+"""
+
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import boto3
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(HERE)
+REPO_DIR = os.path.dirname(SERVER_DIR)
+sys.path.append(SERVER_DIR)
+sys.path.append(os.path.join(SERVER_DIR, "BackendSerice"))
+from common.observability import parse_server_timing
+from s3_uploads import content_type_for
+from fake_embeddings import FakeEmbeddingServer
+from fake_openai import FakeOpenAIServer
+
+DEFAULT_DATA_DIR = os.path.join(REPO_DIR, "database", "data", "test-data")
+DEFAULT_QUERIES = [
+    "Summarise the main ideas of the first chapter.",
+    "What definitions are introduced in chapter two?",
+    "List the key terms and explain each briefly.",
+    "What examples are used to illustrate the concepts?",
+    "How do the later chapters build on the earlier ones?",
+    "What are the conclusions of chapter four?",
+]
+
+# name -> (service directory, port)
+SERVICES = {
+    "extractor": ("ExtractorService", 8001),
+    "llm": ("LLMPromptService", 8002),
+    "db": ("DBService", 8003),
+    "embedding": ("EmbeddingService", 8004),
+    "backend": ("BackendSerice", 8000),
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def summarise(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 50) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "mean_ms": sum(values) / len(values) * 1000 if values else 0.0,
+    }
+
+
+class StageTimings:
+    """Collects per-stage durations from ``Server-Timing`` headers, plus the client-side total."""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = defaultdict(list)
+        self.totals: List[float] = []
+        self.errors = 0
+
+    def add(self, response: Optional[requests.Response], elapsed: float) -> None:
+        if response is None or response.status_code >= 400:
+            self.errors += 1
+            return
+        self.totals.append(elapsed)
+        per_request: Dict[str, float] = defaultdict(float)
+        for name, seconds in parse_server_timing(response.headers.get("Server-Timing")):
+            per_request[name] += seconds
+        for name, seconds in per_request.items():
+            self.stages[name].append(seconds)
+
+    def report(self) -> dict:
+        return {
+            "requests": len(self.totals) + self.errors,
+            "errors": self.errors,
+            "latency": summarise(self.totals),
+            "stages": {name: summarise(values) for name, values in sorted(self.stages.items())},
+        }
+
+
+# ---------------- Stand-ins and services ----------------
+
+def start_s3(endpoint: Optional[str], bucket: str):
+    """Return ``(endpoint_url, stop)`` for an S3 API with ``bucket`` created."""
+    stop = lambda: None
+    if endpoint is None:
+        from moto.server import ThreadedMotoServer
+
+        moto = ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+        moto.start()
+        host, port = moto.get_host_and_port()
+        endpoint, stop = f"http://{host}:{port}", moto.stop
+    s3 = boto3.client("s3", endpoint_url=endpoint, region_name="us-east-1",
+                      aws_access_key_id="testing", aws_secret_access_key="testing")
+    try:
+        s3.create_bucket(Bucket=bucket)
+    except s3.exceptions.BucketAlreadyOwnedByYou:
+        pass
+    return endpoint, stop
+
+
+def service_env(args, s3_endpoint: str, embed_url: str, llm_base_url: str) -> Dict[str, str]:
+    url = lambda name: f"http://127.0.0.1:{SERVICES[name][1]}"
+    return {
+        **os.environ,
+        "AWS_ENDPOINT_URL_S3": s3_endpoint,
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_DEFAULT_REGION": "us-east-1",
+        "S3_BUCKET_NAME": args.bucket,
+        "DB_SERVICE_URL": url("db"),
+        "LLM_PROMPT_SERVICE_URL": url("llm"),
+        "EXTRACTOR_SERVICE_URL": url("extractor"),
+        "HF_API_URL": embed_url,
+        "HF_API_TOKEN": "fake",
+        "LLM_PROVIDER": "openai",
+        "OPENAI_API_KEY": "sk-fake",
+        "OPENAI_API_BASE": llm_base_url,
+        # The fake provider has no quota; keep admission control out of the numbers
+        "LLM_RPM": "0",
+        "LLM_TPM": "0",
+        "LOG_LEVEL": "WARNING",
+    }
+
+
+def start_service(name: str, env: Dict[str, str], log_dir: str) -> subprocess.Popen:
+    directory, port = SERVICES[name]
+    log = open(os.path.join(log_dir, f"{name}.log"), "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=os.path.join(SERVER_DIR, directory), env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+def wait_until_ready(name: str, process: subprocess.Popen, timeout: float) -> None:
+    url = f"http://127.0.0.1:{SERVICES[name][1]}/metrics"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} exited with {process.returncode}; see its log")
+        try:
+            if requests.get(url, timeout=1).ok:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{name} did not become ready within {timeout:.0f}s")
+
+
+# ---------------- Workload ----------------
+
+def ingest_session(backend: str, files: List[str], copies: int, tag: str, store_timings: StageTimings) -> str:
+    session_id = requests.get(f"{backend}/createSession").json()["session_id"]
+    uploads = {}
+    for path in files:
+        stem, ext = os.path.splitext(os.path.basename(path))
+        for copy in range(copies):
+            uploads[f"{stem}-{copy}{ext}"] = path
+    response = requests.post(f"{backend}/uploadDocs", json={"session_id": session_id, "filenames": list(uploads)})
+    response.raise_for_status()
+    for name, url in response.json()["presigned_urls"].items():
+        with open(uploads[name], "rb") as f:
+            requests.put(url, data=f, headers={"Content-Type": content_type_for(name)}).raise_for_status()
+
+    start = time.perf_counter()
+    response = requests.post(f"{backend}/store", json={"session_id": session_id, "tag": tag})
+    store_timings.add(response, time.perf_counter() - start)
+    response.raise_for_status()
+    return session_id
+
+
+def run_ingest(args, backend: str) -> dict:
+    files = sorted(
+        os.path.join(args.data_dir, name) for name in os.listdir(args.data_dir)
+        if os.path.splitext(name)[1].lstrip(".").lower() in ("pdf", "pptx", "txt")
+    )
+    timings = StageTimings()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.ingest_concurrency) as pool:
+        sessions = list(pool.map(
+            lambda _: ingest_session(backend, files, args.copies, args.tag, timings), range(args.sessions)
+        ))
+    elapsed = time.perf_counter() - start
+    documents = len(files) * args.copies * args.sessions
+    return {
+        "sessions": sessions,
+        "documents": documents,
+        "seconds": elapsed,
+        "docs_per_sec": documents / elapsed,
+        "store": timings.report(),
+    }
+
+
+def run_queries(args, backend: str, sessions: List[str]) -> dict:
+    queries = DEFAULT_QUERIES
+    if args.queries_file:
+        with open(args.queries_file) as f:
+            queries = [line.strip() for line in f if line.strip()]
+    timings = StageTimings()
+
+    def one(i: int) -> None:
+        params = {"query": queries[i % len(queries)], "session_id": sessions[i % len(sessions)], "tag": args.tag}
+        start = time.perf_counter()
+        try:
+            response = requests.get(f"{backend}/query", params=params, timeout=120)
+        except requests.RequestException:
+            response = None
+        timings.add(response, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    return {**timings.report(), "seconds": elapsed, "requests_per_sec": args.requests / elapsed}
+
+
+# ---------------- Regression check ----------------
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Human-readable regressions of ``current`` against ``baseline`` beyond ``threshold``."""
+    regressions = []
+
+    def check_latency(label: str, base: dict, new: dict) -> None:
+        for key in ("p50_ms", "p99_ms"):
+            if base.get(key) and new.get(key, 0) > base[key] * (1 + threshold):
+                regressions.append(f"{label} {key}: {base[key]:.1f} -> {new[key]:.1f}")
+
+    base_ingest, new_ingest = baseline["ingest"], current["ingest"]
+    if new_ingest["docs_per_sec"] < base_ingest["docs_per_sec"] * (1 - threshold):
+        regressions.append(
+            f"ingest docs/sec: {base_ingest['docs_per_sec']:.2f} -> {new_ingest['docs_per_sec']:.2f}"
+        )
+    for phase, base, new in (("store", base_ingest["store"], new_ingest["store"]),
+                             ("query", baseline["query"], current["query"])):
+        check_latency(phase, base["latency"], new["latency"])
+        for stage_name, stage in base["stages"].items():
+            if stage_name in new["stages"]:
+                check_latency(f"{phase} {stage_name}", stage, new["stages"][stage_name])
+    return regressions
+
+
+def print_report(results: dict) -> None:
+    ingest, query = results["ingest"], results["query"]
+    print(f"ingest: {ingest['documents']} docs in {ingest['seconds']:.1f}s = {ingest['docs_per_sec']:.2f} docs/sec")
+    for phase, report in (("store", ingest["store"]), ("query", query)):
+        latency = report["latency"]
+        print(f"\n{phase}: {report['requests']} requests, {report['errors']} errors, "
+              f"p50 {latency['p50_ms']:.1f} ms, p99 {latency['p99_ms']:.1f} ms")
+        for name, stage in report["stages"].items():
+            print(f"  {name:28s} p50 {stage['p50_ms']:9.1f} ms   p99 {stage['p99_ms']:9.1f} ms   n={stage['count']}")
+    print(f"\nquery throughput: {query['requests_per_sec']:.1f} requests/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--sessions", type=int, default=2)
+    parser.add_argument("--copies", type=int, default=1, help="uploads of every file per session")
+    parser.add_argument("--ingest-concurrency", type=int, default=2)
+    parser.add_argument("--tag", default="bench")
+    parser.add_argument("--queries-file", help="one query per line (default: a built-in set)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--embedding", choices=("fake", "service"), default="fake",
+                        help="fake HF endpoint, or run EmbeddingService (loads the real model)")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="seconds per fake embedding call")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per fake LLM call")
+    parser.add_argument("--s3-endpoint", help="existing S3-compatible endpoint instead of moto")
+    parser.add_argument("--bucket", default="cleocog-bench")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="results JSON (default: benchmarks/results/e2e-<time>.json)")
+    parser.add_argument("--compare", help="baseline results JSON to check this run against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression")
+    args = parser.parse_args()
+
+    results_dir = os.path.join(HERE, "results")
+    log_dir = os.path.join(results_dir, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+
+    s3_endpoint, stop_s3 = start_s3(args.s3_endpoint, args.bucket)
+    llm = FakeOpenAIServer(("127.0.0.1", 0), latency=args.llm_latency).start()
+    names = ["extractor", "llm", "db", "backend"]
+    if args.embedding == "service":
+        names.insert(0, "embedding")
+        embed_url = f"http://127.0.0.1:{SERVICES['embedding'][1]}/embed"
+    else:
+        embed_url = FakeEmbeddingServer(("127.0.0.1", 0), latency=args.embed_latency).start().url
+
+    env = service_env(args, s3_endpoint, embed_url, llm.base_url)
+    processes = {}
+    try:
+        for name in names:
+            processes[name] = start_service(name, env, log_dir)
+        for name in names:
+            wait_until_ready(name, processes[name], args.startup_timeout)
+
+        backend = f"http://127.0.0.1:{SERVICES['backend'][1]}"
+        ingest = run_ingest(args, backend)
+        query = run_queries(args, backend, ingest.pop("sessions"))
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.wait(timeout=30)
+        stop_s3()
+
+    results = {
+        "run_id": str(uuid.uuid4()),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "threshold")},
+        "ingest": ingest,
+        "query": query,
+    }
+    output = args.output or os.path.join(results_dir, f"e2e-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print_report(results)
+    print(f"\nresults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions:
+            print(f"\nregressions beyond {args.threshold:.0%} against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nno regressions beyond {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
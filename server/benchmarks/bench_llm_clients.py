@@ -0,0 +1,71 @@
+"""Connection setup saved by the LLM client registry, measured against a local fake API.
+
+"per-request" builds a new ``ChatOpenAI`` for every call, as ``get_llm()`` used to;
+"registry" reuses the client from ``llm_registry``. The fake server counts the TCP
+connections each mode opened. Pass ``--certfile/--keyfile`` (a self-signed cert for
+127.0.0.1) to include TLS handshakes; the cert is trusted via ``SSL_CERT_FILE``.
+
+Needs the LLMPromptService requirements installed:
+
+    python benchmarks/bench_llm_clients.py --requests 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(HERE))
+sys.path.append(os.path.join(os.path.dirname(HERE), "LLMPromptService"))
+from fake_openai import FakeOpenAIServer
+
+
+async def run_mode(label: str, make_client, requests: int, server: FakeOpenAIServer) -> None:
+    connections_before = server.connections
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        llm = make_client()
+        await llm.bind(temperature=0.0, max_tokens=32).ainvoke("ping")
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"{label:12s} mean {statistics.mean(latencies) * 1000:7.2f} ms   "
+          f"p50 {latencies[len(latencies) // 2] * 1000:7.2f} ms   "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.2f} ms   "
+          f"connections {server.connections - connections_before}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--certfile")
+    parser.add_argument("--keyfile")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(("127.0.0.1", 0), certfile=args.certfile, keyfile=args.keyfile).start()
+    os.environ.update({
+        "LLM_PROVIDER": "openai",
+        "OPENAI_MODEL": "fake-model",
+        "OPENAI_API_KEY": "sk-fake",
+        "OPENAI_API_BASE": server.base_url,
+    })
+    if args.certfile:
+        os.environ["SSL_CERT_FILE"] = args.certfile
+
+    from langchain_openai import ChatOpenAI
+    import llm_registry
+
+    async def bench():
+        await run_mode("per-request", lambda: ChatOpenAI(model="fake-model", temperature=0.7, max_tokens=500),
+                       args.requests, server)
+        await run_mode("registry", lambda: llm_registry.get_client("openai"), args.requests, server)
+
+    asyncio.run(bench())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Cold-start cost of LLMPromptService per provider: eager vs lazy provider imports.
+
+Every sample is a fresh interpreter, as on a Lambda cold start:
+
+- "eager" imports all provider SDKs up front, as main.py used to
+  (``langchain_openai``, ``langchain_community`` chat models, ``langchain_google_genai``),
+- "lazy" imports ``main`` with ``AWS_LAMBDA_FUNCTION_NAME`` set, so only the configured
+  provider is imported and its client is built during init.
+
+``--profile`` adds the heaviest modules from ``python -X importtime`` for each run.
+Needs the LLMPromptService requirements installed:
+
+    python benchmarks/bench_llm_cold_start.py --providers openai,anthropic,google,deepseek,bedrock --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "LLMPromptService")
+
+# main.py's non-provider imports, present in both variants
+MAIN_DEPS = "import fastapi, pydantic, mangum"
+
+EAGER_IMPORTS = (
+    MAIN_DEPS + "; "
+    "from langchain_openai import ChatOpenAI; "
+    "from langchain_community.chat_models import ChatOpenAI, ChatAnthropic; "
+    "from langchain_google_genai import ChatGoogleGenerativeAI"
+)
+
+TIMED = "import time; _t = time.perf_counter(); {code}; print(time.perf_counter() - _t)"
+
+FAKE_ENV = {
+    "AWS_LAMBDA_FUNCTION_NAME": "cold-start-bench",
+    "OPENAI_API_KEY": "sk-fake",
+    "DEEPSEEK_API_KEY": "sk-fake",
+    "ANTHROPIC_API_KEY": "fake",
+    "GOOGLE_API_KEY": "fake",
+    "AWS_REGION": "us-west-2",
+    "AWS_ACCESS_KEY_ID": "fake",
+    "AWS_SECRET_ACCESS_KEY": "fake",
+}
+
+
+def _run(code: str, provider: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    env = {**os.environ, **FAKE_ENV, "LLM_PROVIDER": provider}
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(args, cwd=SERVICE_DIR, env=env, capture_output=True, text=True, check=True)
+
+
+def sample(code: str, provider: str, runs: int) -> list:
+    return [float(_run(TIMED.format(code=code), provider).stdout.strip().splitlines()[-1]) for _ in range(runs)]
+
+
+def heaviest_imports(code: str, provider: str, top: int) -> list:
+    """``(cumulative_us, module)`` for the top-level imports that cost the most."""
+    rows = []
+    for line in _run(code, provider, importtime=True).stderr.splitlines():
+        fields = line[len("import time:"):].split("|")
+        if not line.startswith("import time:") or len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2][1:]  # drop the separator's space; what is left is indentation per nesting level
+        if not name.startswith(" "):
+            rows.append((int(fields[1]), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--providers", default="openai,anthropic,google,deepseek,bedrock")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--profile", action="store_true", help="print the heaviest imports per run")
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    eager, lazy = EAGER_IMPORTS, "import main"
+    print(f"{'provider':10s} {'eager (s)':>10s} {'lazy (s)':>10s} {'saved':>8s}")
+    for provider in args.providers.split(","):
+        eager_times = sample(eager, provider, args.runs)
+        lazy_times = sample(lazy, provider, args.runs)
+        e, l = statistics.median(eager_times), statistics.median(lazy_times)
+        print(f"{provider:10s} {e:10.3f} {l:10.3f} {(e - l) / e * 100:7.1f}%")
+        if args.profile:
+            for label, code in (("eager", eager), ("lazy", lazy)):
+                print(f"  {label} heaviest imports:")
+                for cumulative_us, module in heaviest_imports(code, provider, args.top):
+                    print(f"    {cumulative_us / 1000:9.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
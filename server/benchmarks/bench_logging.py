@@ -0,0 +1,108 @@
+"""Compare the logging cost of a large /store before and after the shared logging setup.
+
+"before" replays what BackendService used to log per /store (the full extractor and
+DB payloads as f-strings at INFO through ``basicConfig``); "after" replays the
+current calls through ``common.logging_config``. Output goes to /dev/null so only
+formatting and handler work is measured. CPU time covers the listener thread too.
+
+    python benchmarks/bench_logging.py --documents 200 --chunks 50 --rounds 20
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import logging_config
+from common.logging_config import configure_logging, truncate
+
+
+def build_payload(documents: int, chunks: int, chunk_chars: int) -> dict:
+    text = ("lorem ipsum dolor sit amet " * (chunk_chars // 27 + 1))[:chunk_chars]
+    return {
+        "session_id": "bench-session",
+        "tag": "bench",
+        "documents": [
+            {"uri": f"s3://bucket/bench-session/doc-{d}.pdf",
+             "chunks": [{"chunk_id": c, "text": text} for c in range(chunks)]}
+            for d in range(documents)
+        ],
+    }
+
+
+def log_before(logger: logging.Logger, payload: dict, uris: list) -> None:
+    extractor_payload = {"documents": uris}
+    logger.info(f"Request payload: {uris}")
+    logger.info("-------------------------------------------------")
+    logger.info(f"Payload to ExtractorService: {extractor_payload}")
+    logger.info("-------------------------------------------------")
+    logger.info(f"Calling ExtractorService with {len(uris)} S3 URIs -->{extractor_payload}")
+    logger.info(f"Transformed data for DBService: {payload}")
+    logger.info(f"Sending {len(payload['documents'])} documents to DBService")
+    logger.info("-------------------------------------------------")
+    logger.info(f"DB request payload: {payload}")
+    logger.info("-------------------------------------------------")
+
+
+def log_after(logger: logging.Logger, payload: dict, uris: list) -> None:
+    logger.info("Found %d S3 URIs for session_id: %s", len(uris), payload["session_id"])
+    logger.debug("S3 URIs: %s", truncate(uris))
+    logger.info("Calling ExtractorService with %d S3 URIs and %d videos", len(uris), 0)
+    logger.info(
+        "Sending %d documents to DBService", len(payload["documents"]),
+        extra={"session_id": payload["session_id"], "tag": payload["tag"]},
+    )
+    logger.debug("DB request payload: %s", truncate(payload))
+
+
+def run(label: str, fn, logger: logging.Logger, payload: dict, rounds: int, drain) -> None:
+    uris = [doc["uri"] for doc in payload["documents"]]
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for _ in range(rounds):
+        fn(logger, payload, uris)
+    caller_wall = time.perf_counter() - wall_start
+    drain()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    print(f"{label:7s} cpu {cpu * 1000 / rounds:9.2f} ms/store   caller {caller_wall * 1000 / rounds:9.2f} ms/store   "
+          f"throughput {rounds / wall:9.1f} stores/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=50)
+    parser.add_argument("--chunk-chars", type=int, default=1500)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    payload = build_payload(args.documents, args.chunks, args.chunk_chars)
+    print(f"payload: {args.documents} documents x {args.chunks} chunks x {args.chunk_chars} chars")
+    logger = logging.getLogger("bench")
+    # Handlers write to devnull; the results are printed to the real stdout.
+    sink = open(os.devnull, "w")
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s", stream=sink)
+    run("before", log_before, logger, payload, args.rounds, drain=lambda: None)
+
+    real_stdout, sys.stdout = sys.stdout, sink
+    try:
+        configure_logging("bench", level="INFO")
+    finally:
+        sys.stdout = real_stdout
+
+    def drain():
+        if logging_config._listener is not None:
+            logging_config._listener.stop()
+            logging_config._listener = None
+
+    run("after", log_after, logger, payload, args.rounds, drain=drain)
+
+
+if __name__ == "__main__":
+    main()
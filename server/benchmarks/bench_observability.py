@@ -0,0 +1,65 @@
+"""Measure the per-request cost of the observability middleware and stage timers.
+
+Drives a bare ASGI app directly (no sockets, no framework) so the numbers isolate the
+instrumentation itself: request-id handling, Server-Timing header, histograms.
+
+    python benchmarks/bench_observability.py --requests 50000 --stages 6
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.observability import ObservabilityMiddleware, stage
+
+
+def make_app(stages: int, instrumented: bool):
+    async def app(scope, receive, send):
+        for i in range(stages):
+            if instrumented:
+                with stage(f"stage_{i}"):
+                    pass
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b"{}"})
+    return app
+
+
+async def drive(app, n: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/query", "headers": [(b"x-request-id", b"bench")]}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(scope, receive, send)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--stages", type=int, default=6, help="stage() blocks per request")
+    args = parser.parse_args()
+
+    baseline = asyncio.run(drive(make_app(args.stages, instrumented=False), args.requests))
+    instrumented = asyncio.run(drive(
+        ObservabilityMiddleware(make_app(args.stages, instrumented=True), service="bench"), args.requests
+    ))
+
+    overhead_us = (instrumented - baseline) / args.requests * 1e6
+    print(f"requests:            {args.requests}")
+    print(f"stages per request:  {args.stages}")
+    print(f"baseline:            {baseline / args.requests * 1e6:8.2f} us/request")
+    print(f"instrumented:        {instrumented / args.requests * 1e6:8.2f} us/request")
+    print(f"overhead:            {overhead_us:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Queries/sec of ``/search/batch`` against looping over ``/search``.
+
+Starts DBService against the local pgvector database (``POSTGRES_*``) and the fake
+embedding endpoint, stores ``--chunks`` synthetic chunks in each of ``--sessions``
+sessions, then answers the same ``--queries`` questions three ways:
+
+- "loop": one ``/search`` call per query, one after another,
+- "loop xN": ``/search`` calls from ``--concurrency`` threads,
+- "batch": ``/search/batch`` with ``--batch-size`` queries per call.
+
+    cd database && docker compose up -d
+    python benchmarks/bench_search_batch.py --queries 512 --batch-size 64
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+from bench_e2e import SERVICES, start_service, wait_until_ready
+from fake_embeddings import FakeEmbeddingServer
+
+DB_URL = f"http://127.0.0.1:{SERVICES['db'][1]}"
+
+
+def seed(sessions: int, chunks: int, tag: str) -> list:
+    session_ids = []
+    for _ in range(sessions):
+        session_id = str(uuid.uuid4())
+        documents = [{
+            "uri": f"s3://bench/{session_id}/doc.pdf",
+            "chunks": [{"chunk_id": i, "text": f"Synthetic chunk {i} of session {session_id}."} for i in range(chunks)],
+        }]
+        requests.post(f"{DB_URL}/store", json={"session_id": session_id, "tag": tag, "documents": documents},
+                      timeout=600).raise_for_status()
+        session_ids.append(session_id)
+    return session_ids
+
+
+def run_loop(queries: list, sessions: list, tag: str, concurrency: int) -> float:
+    def one(i: int) -> None:
+        payload = {"query": queries[i], "session_id": sessions[i % len(sessions)], "tag": tag}
+        requests.post(f"{DB_URL}/search", json=payload).raise_for_status()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(len(queries))))
+    return time.perf_counter() - start
+
+
+def run_batch(queries: list, sessions: list, tag: str, batch_size: int) -> float:
+    start = time.perf_counter()
+    for offset in range(0, len(queries), batch_size):
+        batch = queries[offset:offset + batch_size]
+        # Same work as the loop: each query against one session, so send one target per session slice
+        for index, session_id in enumerate(sessions):
+            payload = {"queries": batch[index::len(sessions)], "targets": [{"session_id": session_id, "tag": tag}]}
+            if payload["queries"]:
+                requests.post(f"{DB_URL}/search/batch", json=payload).raise_for_status()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--chunks", type=int, default=500, help="chunks stored per session")
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--embed-latency", type=float, default=0.02, help="seconds per fake embedding call")
+    args = parser.parse_args()
+
+    embeddings = FakeEmbeddingServer(("127.0.0.1", 0)).start()
+    env = {**os.environ, "HF_API_URL": embeddings.url, "HF_API_TOKEN": "fake", "LOG_LEVEL": "WARNING"}
+    process = start_service("db", env, tempfile.mkdtemp())
+    tag = "bench"
+    try:
+        wait_until_ready("db", process, 60)
+        sessions = seed(args.sessions, args.chunks, tag)
+        embeddings.latency = args.embed_latency  # only the measured searches pay the simulated API latency
+        queries = [f"Question {i} about synthetic chunk {i % args.chunks}?" for i in range(args.queries)]
+
+        print(f"{len(queries)} queries over {len(sessions)} sessions of {args.chunks} chunks")
+        for label, elapsed in (
+            ("loop", run_loop(queries, sessions, tag, 1)),
+            (f"loop x{args.concurrency}", run_loop(queries, sessions, tag, args.concurrency)),
+            (f"batch of {args.batch_size}", run_batch(queries, sessions, tag, args.batch_size)),
+        ):
+            print(f"  {label:14s} {elapsed:7.2f} s   {len(queries) / elapsed:8.1f} queries/sec")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
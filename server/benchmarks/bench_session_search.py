@@ -0,0 +1,150 @@
+"""Per-session search latency as the documents table grows: flat vs hash-partitioned.
+
+Builds two scratch tables in a ``bench_sessions`` schema of the local pgvector
+database (``POSTGRES_*``, as DBService reads them):
+
+- "flat": the old ``documents`` layout, one table with no index,
+- "partitioned": the ``database/init.sql`` layout, hash-partitioned by ``session_id``
+  with a ``(session_id, tag)`` index,
+
+fills both with ``--rows-per-session`` random 384-d chunks per session up to each
+total in ``--totals``, and times DBService's search query and a session delete at
+every step. The schema is dropped afterwards.
+
+    cd database && docker compose up -d
+    python benchmarks/bench_session_search.py --totals 10000,100000,500000 --searches 200
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+import asyncpg
+
+SCHEMA = "bench_sessions"
+DIMENSIONS = 384
+PARTITIONS = 16
+
+COLUMNS = """
+    id SERIAL,
+    content TEXT NOT NULL,
+    chunk_id INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    embedding vector(384)
+"""
+
+LAYOUTS = {
+    "flat": [f"CREATE TABLE {SCHEMA}.flat ({COLUMNS}, PRIMARY KEY (id))"],
+    "partitioned": [
+        f"CREATE TABLE {SCHEMA}.partitioned ({COLUMNS}, PRIMARY KEY (session_id, id)) PARTITION BY HASH (session_id)",
+        *[
+            f"CREATE TABLE {SCHEMA}.partitioned_p{i} PARTITION OF {SCHEMA}.partitioned "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {i})"
+            for i in range(PARTITIONS)
+        ],
+        f"CREATE INDEX ON {SCHEMA}.partitioned (session_id, tag)",
+    ],
+}
+
+# Random vectors are generated server-side; "+ 0 * g" makes the subquery run per row
+FILL = """
+    INSERT INTO {table} (content, chunk_id, tag, session_id, embedding)
+    SELECT 'chunk ' || g, g % $3, 'bench', 'session-' || (g / $3),
+           (SELECT array_agg(random() + 0 * g) FROM generate_series(1, {dimensions}))::vector
+    FROM generate_series($1, $2 - 1) AS g
+"""
+
+SEARCH = """
+    SELECT id, content, chunk_id, tag, session_id
+    FROM {table}
+    WHERE tag = $1 AND session_id = $2
+    ORDER BY embedding <-> $3
+    LIMIT $4
+"""
+
+
+def dsn() -> str:
+    return "postgresql://{}:{}@{}:{}/{}".format(
+        os.getenv("POSTGRES_USER", "postgres"),
+        os.getenv("POSTGRES_PASSWORD", "postgres"),
+        os.getenv("POSTGRES_HOST", "localhost"),
+        os.getenv("POSTGRES_PORT", "5432"),
+        os.getenv("POSTGRES_DB", "postgres"),
+    )
+
+
+def random_vector() -> str:
+    return "[" + ",".join(f"{random.random():.6f}" for _ in range(DIMENSIONS)) + "]"
+
+
+async def time_searches(conn, table: str, sessions: int, searches: int, top_k: int) -> list:
+    query = SEARCH.format(table=f"{SCHEMA}.{table}")
+    latencies = []
+    for _ in range(searches):
+        session_id = f"session-{random.randrange(sessions)}"
+        embedding = random_vector()
+        start = time.perf_counter()
+        await conn.fetch(query, "bench", session_id, embedding, top_k)
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies)
+
+
+async def time_delete(conn, table: str, session_id: str) -> float:
+    start = time.perf_counter()
+    await conn.execute(f"DELETE FROM {SCHEMA}.{table} WHERE session_id = $1", session_id)
+    return time.perf_counter() - start
+
+
+async def run(args) -> None:
+    conn = await asyncpg.connect(dsn())
+    totals = sorted(int(t) for t in args.totals.split(","))
+    try:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+        for statements in LAYOUTS.values():
+            for statement in statements:
+                await conn.execute(statement)
+
+        print(f"{'rows':>9s} {'layout':12s} {'p50 ms':>8s} {'p99 ms':>8s} {'delete ms':>10s}")
+        filled = 0
+        for total in totals:
+            for table in LAYOUTS:
+                await conn.execute(
+                    FILL.format(table=f"{SCHEMA}.{table}", dimensions=DIMENSIONS), filled, total, args.rows_per_session
+                )
+                await conn.execute(f"ANALYZE {SCHEMA}.{table}")
+            sessions = total // args.rows_per_session
+            for table in LAYOUTS:
+                await time_searches(conn, table, sessions, min(20, args.searches), args.top_k)  # warm the cache
+                latencies = await time_searches(conn, table, sessions, args.searches, args.top_k)
+                # Delete the newest session, then put it back so the next step starts from the same total
+                deleted = await time_delete(conn, table, f"session-{sessions - 1}")
+                await conn.execute(
+                    FILL.format(table=f"{SCHEMA}.{table}", dimensions=DIMENSIONS),
+                    (sessions - 1) * args.rows_per_session, sessions * args.rows_per_session, args.rows_per_session
+                )
+                print(f"{total:9d} {table:12s} {statistics.median(latencies) * 1000:8.2f} "
+                      f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:8.2f} {deleted * 1000:10.2f}")
+            filled = total
+    finally:
+        if not args.keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--totals", default="10000,50000,200000", help="total row counts to measure at")
+    parser.add_argument("--rows-per-session", type=int, default=200)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the bench_sessions schema")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""DBService peak memory and throughput: one JSON ``/store`` body vs NDJSON ``/store/stream``.
+
+Each mode gets a fresh DBService process (against the local pgvector database and
+the fake embedding endpoint) and stores the same ``--chunks`` synthetic chunks of
+``--chunk-chars`` characters. Peak RSS is read from ``/proc/<pid>/status`` (Linux).
+
+    cd database && docker compose up -d
+    python benchmarks/bench_store_stream.py --chunks 20000 --window 64
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+from bench_e2e import SERVICES, start_service, wait_until_ready
+from fake_embeddings import FakeEmbeddingServer
+
+DB_URL = f"http://127.0.0.1:{SERVICES['db'][1]}"
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def chunk_text(i: int, chars: int) -> str:
+    return (f"Synthetic chunk {i}. " * (chars // 20 + 1))[:chars]
+
+
+def store_json(session_id: str, chunks: int, chars: int) -> None:
+    documents = [{"uri": "s3://bench/doc.pdf",
+                  "chunks": [{"chunk_id": i, "text": chunk_text(i, chars)} for i in range(chunks)]}]
+    requests.post(f"{DB_URL}/store", json={"session_id": session_id, "tag": "bench", "documents": documents},
+                  timeout=3600).raise_for_status()
+
+
+def store_stream(session_id: str, chunks: int, chars: int, window: int) -> None:
+    lines = (
+        (json.dumps({"uri": "s3://bench/doc.pdf", "chunk_id": i, "text": chunk_text(i, chars)}) + "\n").encode()
+        for i in range(chunks)
+    )
+    requests.post(f"{DB_URL}/store/stream", params={"session_id": session_id, "tag": "bench", "window": window},
+                  data=lines, headers={"Content-Type": "application/x-ndjson"}, timeout=3600).raise_for_status()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--chunk-chars", type=int, default=1000)
+    parser.add_argument("--window", type=int, default=64)
+    args = parser.parse_args()
+
+    embeddings = FakeEmbeddingServer(("127.0.0.1", 0)).start()
+    env = {**os.environ, "HF_API_URL": embeddings.url, "HF_API_TOKEN": "fake", "LOG_LEVEL": "WARNING"}
+    print(f"{args.chunks} chunks of {args.chunk_chars} chars")
+    for label, store in (
+        ("/store", lambda session_id: store_json(session_id, args.chunks, args.chunk_chars)),
+        ("/store/stream", lambda session_id: store_stream(session_id, args.chunks, args.chunk_chars, args.window)),
+    ):
+        process = start_service("db", env, tempfile.mkdtemp())
+        try:
+            wait_until_ready("db", process, 60)
+            idle = peak_rss_mb(process.pid)
+            start = time.perf_counter()
+            store(str(uuid.uuid4()))
+            elapsed = time.perf_counter() - start
+            print(f"  {label:14s} {elapsed:7.1f} s   {args.chunks / elapsed:8.1f} chunks/sec   "
+                  f"peak RSS {peak_rss_mb(process.pid):7.1f} MB (idle {idle:.1f} MB)")
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Compact embedding storage vs the current layout: size, latency and recall@k.
+
+Builds two scratch ``documents`` tables in the local pgvector database (``POSTGRES_*``):
+
+- ``bench_vector.documents``: full-precision ``vector(384)``, as stored today,
+- ``bench_halfvec.documents``: the same vectors as ``halfvec(384)`` with the binary
+  quantization HNSW index, as after ``003_compact_embeddings.sql``,
+
+and runs DBService's own search SQL (``vector_storage.nearest_sql``) against both.
+Recall@k is measured against the exact full-precision results, for each
+``--overfetch``. Vectors are random with mixed signs, which is harder for binary
+quantization than real sentence embeddings, so recall here is a lower bound.
+
+    cd database && docker compose up -d
+    python benchmarks/bench_vector_storage.py --rows 200000 --rows-per-session 200000 --overfetch 4,10,20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+import asyncpg
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(HERE), "DBService"))
+from vector_storage import DIMENSIONS, candidate_count, embedding_type, nearest_sql, prefilter_settings
+
+SCHEMAS = {"vector": "bench_vector", "halfvec": "bench_halfvec"}
+
+COLUMNS = """
+    id SERIAL PRIMARY KEY,
+    content TEXT NOT NULL,
+    chunk_id INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    video_id TEXT,
+    uri TEXT,
+    session_id TEXT NOT NULL
+"""
+
+FILL = f"""
+    INSERT INTO bench_vector.documents (content, chunk_id, tag, session_id, embedding)
+    SELECT 'chunk ' || g, g % $2, 'bench', 'session-' || (g / $2),
+           (SELECT array_agg(random() - 0.5 + 0 * g) FROM generate_series(1, {DIMENSIONS}))::vector
+    FROM generate_series(0, $1 - 1) AS g
+"""
+
+
+def dsn() -> str:
+    return "postgresql://{}:{}@{}:{}/{}".format(
+        os.getenv("POSTGRES_USER", "postgres"),
+        os.getenv("POSTGRES_PASSWORD", "postgres"),
+        os.getenv("POSTGRES_HOST", "localhost"),
+        os.getenv("POSTGRES_PORT", "5432"),
+        os.getenv("POSTGRES_DB", "postgres"),
+    )
+
+
+async def build(conn, rows: int, rows_per_session: int) -> None:
+    for schema in SCHEMAS.values():
+        await conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}")
+    await conn.execute(f"CREATE TABLE bench_vector.documents ({COLUMNS}, embedding vector({DIMENSIONS}))")
+    await conn.execute(f"CREATE TABLE bench_halfvec.documents ({COLUMNS}, embedding_half halfvec({DIMENSIONS}))")
+    await conn.execute(FILL, rows, rows_per_session)
+    await conn.execute(f"""
+        INSERT INTO bench_halfvec.documents (id, content, chunk_id, tag, session_id, embedding_half)
+        SELECT id, content, chunk_id, tag, session_id, embedding::halfvec({DIMENSIONS}) FROM bench_vector.documents
+    """)
+    for schema in SCHEMAS.values():
+        await conn.execute(f"CREATE INDEX ON {schema}.documents (session_id, tag)")
+    await conn.execute(f"""
+        CREATE INDEX ON bench_halfvec.documents
+        USING hnsw ((binary_quantize(embedding_half)::bit({DIMENSIONS})) bit_hamming_ops)
+    """)
+    for schema in SCHEMAS.values():
+        await conn.execute(f"ANALYZE {schema}.documents")
+
+
+async def sizes(conn, schema: str) -> tuple:
+    row = await conn.fetchrow(
+        "SELECT pg_table_size($1::regclass) AS tbl, pg_indexes_size($1::regclass) AS idx", f"{schema}.documents"
+    )
+    return row["tbl"] / 2 ** 20, row["idx"] / 2 ** 20
+
+
+async def search(conn, storage: str, embedding: str, session_id: str, top_k: int, overfetch: int) -> tuple:
+    await conn.execute(f"SET search_path TO {SCHEMAS[storage]}, public")
+    query = nearest_sql(storage, where="tag = $1 AND session_id = $2",
+                        query=f"$3::{embedding_type(storage)}", limit="$4", candidates="$5")
+    args = ["bench", session_id, embedding, top_k]
+    if storage != "vector":
+        args.append(candidate_count(top_k, overfetch))
+        await conn.execute(prefilter_settings(args[-1]))
+    start = time.perf_counter()
+    rows = await conn.fetch(query, *args)
+    return time.perf_counter() - start, [row["id"] for row in rows]
+
+
+def random_vector() -> str:
+    return "[" + ",".join(f"{random.random() - 0.5:.6f}" for _ in range(DIMENSIONS)) + "]"
+
+
+async def run(args) -> None:
+    conn = await asyncpg.connect(dsn())
+    try:
+        print(f"building {args.rows} rows, {args.rows_per_session} per session...")
+        await build(conn, args.rows, args.rows_per_session)
+        sessions = max(1, args.rows // args.rows_per_session)
+        queries = [(random_vector(), f"session-{random.randrange(sessions)}") for _ in range(args.queries)]
+
+        exact, exact_latencies = [], []
+        for embedding, session_id in queries:
+            elapsed, ids = await search(conn, "vector", embedding, session_id, args.top_k, 0)
+            exact.append(set(ids))
+            exact_latencies.append(elapsed)
+
+        print(f"\n{'layout':24s} {'table MB':>9s} {'index MB':>9s} {'p50 ms':>8s} {'p99 ms':>8s} "
+              f"{'recall@' + str(args.top_k):>10s}")
+        table_mb, index_mb = await sizes(conn, SCHEMAS["vector"])
+        exact_latencies.sort()
+        print(f"{'vector (current)':24s} {table_mb:9.1f} {index_mb:9.1f} {statistics.median(exact_latencies) * 1000:8.2f} "
+              f"{exact_latencies[int(len(exact_latencies) * 0.99) - 1] * 1000:8.2f} {1.0:10.3f}")
+
+        table_mb, index_mb = await sizes(conn, SCHEMAS["halfvec"])
+        for overfetch in (int(o) for o in args.overfetch.split(",")):
+            latencies, recalls = [], []
+            for (embedding, session_id), truth in zip(queries, exact):
+                elapsed, ids = await search(conn, "halfvec", embedding, session_id, args.top_k, overfetch)
+                latencies.append(elapsed)
+                recalls.append(len(truth & set(ids)) / max(1, len(truth)))
+            latencies.sort()
+            print(f"{'halfvec, overfetch ' + str(overfetch):24s} {table_mb:9.1f} {index_mb:9.1f} "
+                  f"{statistics.median(latencies) * 1000:8.2f} {latencies[int(len(latencies) * 0.99) - 1] * 1000:8.2f} "
+                  f"{statistics.mean(recalls):10.3f}")
+    finally:
+        if not args.keep:
+            for schema in SCHEMAS.values():
+                await conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--rows-per-session", type=int, default=100000, help="equal to --rows: one big session")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--overfetch", default="4,10,20")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch schemas")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
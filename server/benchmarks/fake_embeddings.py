@@ -0,0 +1,92 @@
+"""A local stand-in for the Hugging Face feature-extraction endpoint DBService calls.
+
+``POST`` with ``{"inputs": "text"}`` returns one 384-dimension vector; with
+``{"inputs": ["a", "b"]}`` it returns a list of vectors. Vectors are derived from
+a hash of the text, so the same text always embeds the same way.
+
+    python benchmarks/fake_embeddings.py --port 9200 [--latency 0.01]
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DIMENSIONS = 384
+
+
+def fake_embedding(text: str, dimensions: int = DIMENSIONS) -> list:
+    values = []
+    counter = 0
+    while len(values) < dimensions:
+        digest = hashlib.sha256(f"{counter}:{text}".encode()).digest()
+        values.extend(v / 2 ** 31 for v in struct.unpack("<8i", digest))
+        counter += 1
+    values = values[:dimensions]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+class FakeEmbeddingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.requests = 0
+        self.texts = 0
+        self._counter_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/embed"
+
+    def start(self) -> "FakeEmbeddingServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        inputs = json.loads(self.rfile.read(length) or b"{}").get("inputs", "")
+        server: FakeEmbeddingServer = self.server
+        batch = inputs if isinstance(inputs, list) else [inputs]
+        with server._counter_lock:
+            server.requests += 1
+            server.texts += len(batch)
+        if server.latency:
+            time.sleep(server.latency)
+        vectors = [fake_embedding(text) for text in batch]
+        body = json.dumps(vectors if isinstance(inputs, list) else vectors[0]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to sleep per request")
+    args = parser.parse_args()
+
+    server = FakeEmbeddingServer((args.host, args.port), args.latency)
+    print(f"Fake embedding endpoint listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Shared logging setup: non-blocking, structured and bounded.
+
+``configure_logging("<service>")`` replaces the per-service ``logging.basicConfig`` calls:
+
+- records go through a bounded in-memory queue and are formatted and written by a
+  background ``QueueListener`` thread, so request handlers never block on stdout;
+  when the queue is full records are dropped and counted instead of stalling callers,
+- every line is a JSON object with ``service``, ``request_id`` and any ``extra=`` fields,
+- DEBUG records are sampled (1 in ``LOG_DEBUG_SAMPLE_RATE`` per message template).
+
+Use ``truncate(value)`` for payloads: it is lazy and bounded, so nothing is rendered
+unless the record is actually emitted, and then at most ``LOG_MAX_CHARS`` characters.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import reprlib
+import sys
+import threading
+from typing import Any, Dict, Optional
+
+from common.observability import get_request_id
+
+LOG_MAX_CHARS = int(os.getenv("LOG_MAX_CHARS", "500"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_DEBUG_SAMPLE_RATE = int(os.getenv("LOG_DEBUG_SAMPLE_RATE", "100"))
+
+# Attributes every LogRecord has; anything else came in through ``extra=`` and is a structured field.
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "service"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class _Truncated:
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: int):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        value = self.value
+        if isinstance(value, (bytes, bytearray)):
+            value = value[: self.limit].decode("utf-8", "replace")
+        if isinstance(value, str):
+            text = value
+        else:
+            # reprlib bounds the work for big containers instead of rendering them whole first
+            limiter = reprlib.Repr()
+            limiter.maxstring = self.limit
+            limiter.maxother = self.limit
+            limiter.maxlist = limiter.maxdict = limiter.maxtuple = limiter.maxset = 10
+            limiter.maxlevel = 4
+            text = limiter.repr(value)
+        if len(text) > self.limit:
+            return f"{text[: self.limit]}...(+{len(text) - self.limit} chars)"
+        return text
+
+    __repr__ = __str__
+
+
+def truncate(value: Any, limit: int = LOG_MAX_CHARS) -> _Truncated:
+    """Wrap a log argument so it renders lazily and to at most ``limit`` characters."""
+    return _Truncated(value, limit)
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "service": self.service,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Capture the request id on the calling thread, before the record crosses the queue."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = get_request_id()
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Keep every record above DEBUG and one in ``rate`` DEBUG records per message template."""
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = max(1, rate)
+        self._seen: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate == 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            seen = self._seen.get(key, 0)
+            if len(self._seen) > 10000:
+                self._seen.clear()
+            self._seen[key] = seen + 1
+        return seen % self.rate == 0
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops (and counts) records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener lives in this process, so skip the default eager formatting;
+        # the message is built on the listener thread only. The record keeps references
+        # to its args, so a mutable argument (or the value inside a ``truncate``) that
+        # the caller changes before the listener gets to it is logged as changed.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(service: str, level: Optional[str] = None) -> None:
+    """Install the shared handlers on the root logger. Safe to call more than once."""
+    global _listener
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter(service))
+
+    # Lambda freezes the process between invocations, which can strand records in a
+    # background queue, so log synchronously there.
+    if "AWS_LAMBDA_FUNCTION_NAME" in os.environ or os.getenv("LOG_ASYNC", "1") == "0":
+        handler: logging.Handler = stream_handler
+    else:
+        handler = BoundedQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+        _listener = logging.handlers.QueueListener(handler.queue, stream_handler, respect_handler_level=False)
+        _listener.start()
+
+    handler.addFilter(DebugSampler(LOG_DEBUG_SAMPLE_RATE))
+    handler.addFilter(ContextFilter())
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+def _stop_listener() -> None:
+    if _listener is not None:
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
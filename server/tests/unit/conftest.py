@@ -0,0 +1,130 @@
+"""Shared test setup for the service modules.
+
+The DBService modules import their siblings by bare name (``from vector_storage import
+...``), as they do when the service runs from its own directory, so that directory is
+put on the path here. ``FakeConnection`` stands in for an asyncpg connection.
+"""
+
+import asyncio
+import os
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(SERVER_DIR, "DBService"))
+
+
+class FakeDatabase:
+    """The DBService tables the tests touch, kept in memory and shared by its connections."""
+
+    def __init__(self):
+        self.streams = {}     # stream_id -> store_streams row
+        self.documents = []   # {"session_id", "content"} per documents row
+        self.sessions = {}    # session_id -> sessions row
+        self.row_locks = {}   # stream_id -> lock held by a FOR UPDATE until its transaction ends
+
+    def contents(self):
+        return [document["content"] for document in self.documents]
+
+
+class FakeTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        self.conn.pending = []
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            for apply in self.conn.pending:
+                apply()
+        self.conn.pending = None
+        while self.conn.locks:
+            self.conn.locks.pop().release()
+
+
+class FakeConnection:
+    """An asyncpg connection to a ``FakeDatabase``, answering DBService's statements by their SQL.
+
+    Every call is recorded in ``statements`` as ``(query, args)`` and yields to the event
+    loop once, like a round trip. Writes inside ``transaction()`` only apply when it
+    commits, and a ``FOR UPDATE`` of a stream blocks other connections until it ends.
+    ``fetch`` returns ``rows``; the ``fail_on_insert``-th documents INSERT raises.
+    """
+
+    def __init__(self, db=None, rows=(), fail_on_insert=None):
+        self.db = db or FakeDatabase()
+        self.rows = list(rows)
+        self.fail_on_insert = fail_on_insert
+        self.inserts = 0
+        self.statements = []
+        self.pending = None
+        self.locks = []
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    def _apply(self, change):
+        if self.pending is None:
+            change()
+        else:
+            self.pending.append(change)
+
+    async def _call(self, query, args):
+        self.statements.append((query, args))
+        await asyncio.sleep(0)
+
+    async def execute(self, query, *args):
+        await self._call(query, args)
+        db = self.db
+        if "INSERT INTO store_streams" in query:
+            db.streams.setdefault(args[0], {
+                "stream_id": args[0], "session_id": args[1], "tag": args[2],
+                "committed_records": 0, "completed": False, "updated_at": None,
+            })
+        elif "INSERT INTO documents" in query:
+            self.inserts += 1
+            if self.inserts == self.fail_on_insert:
+                raise ConnectionError("database went away")
+            rows = [{"session_id": args[6], "content": content} for content in args[0]]
+            self._apply(lambda: db.documents.extend(rows))
+        elif "SET committed_records" in query:
+            self._apply(lambda: db.streams[args[0]].update(committed_records=args[1]))
+        elif "SET completed = true" in query:
+            db.streams[args[0]]["completed"] = True
+        elif "DELETE FROM documents" in query:
+            session_id, batch_size = args
+            kept, deleted = [], 0
+            for document in db.documents:
+                if document["session_id"] == session_id and deleted < batch_size:
+                    deleted += 1
+                else:
+                    kept.append(document)
+            db.documents = kept
+            return f"DELETE {deleted}"
+        elif "DELETE FROM store_streams" in query:
+            db.streams = {k: v for k, v in db.streams.items() if v["session_id"] != args[0]}
+        elif "DELETE FROM sessions" in query:
+            return f"DELETE {int(db.sessions.pop(args[0], None) is not None)}"
+        return "OK"
+
+    async def fetch(self, query, *args):
+        await self._call(query, args)
+        return self.rows
+
+    async def fetchrow(self, query, *args):
+        await self._call(query, args)
+        if "FROM store_streams" in query:
+            return self.db.streams.get(args[0])
+        return None
+
+    async def fetchval(self, query, *args):
+        await self._call(query, args)
+        if "FROM store_streams" in query and "FOR UPDATE" in query:
+            lock = self.db.row_locks.setdefault(args[0], asyncio.Lock())
+            await lock.acquire()
+            self.locks.append(lock)
+            return self.db.streams[args[0]]["committed_records"]
+        if "reaping_at IS NOT NULL FROM sessions" in query:
+            session = self.db.sessions.get(args[0])
+            return None if session is None else session.get("reaping_at") is not None
+        return None
@@ -0,0 +1,86 @@
+import hashlib
+import uuid
+
+
+class FakeS3:
+    """In-memory stand-in for the subset of the boto3 S3 client the services use."""
+
+    def __init__(self):
+        self.objects = {}
+        self.content_types = {}
+        self.uploads = {}
+        self.list_calls = 0
+
+    def put_object(self, Bucket, Key, Body=b"", **kwargs):
+        body = Body.encode() if isinstance(Body, str) else Body
+        self.objects[(Bucket, Key)] = body
+        self.content_types[(Bucket, Key)] = kwargs.get("ContentType")
+        return {"ETag": f'"{hashlib.md5(body).hexdigest()}"'}
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000, ContinuationToken=None):
+        self.list_calls += 1
+        keys = sorted(k for b, k in self.objects if b == Bucket and k.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + MaxKeys]
+        response = {
+            "Contents": [
+                {
+                    "Key": key,
+                    "ETag": f'"{hashlib.md5(self.objects[(Bucket, key)]).hexdigest()}"',
+                    "Size": len(self.objects[(Bucket, key)]),
+                }
+                for key in page
+            ],
+            "IsTruncated": start + MaxKeys < len(keys),
+        }
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = str(start + MaxKeys)
+        return response
+
+    def delete_objects(self, Bucket, Delete):
+        self.delete_calls = getattr(self, "delete_calls", 0) + 1
+        for obj in Delete["Objects"]:
+            self.objects.pop((Bucket, obj["Key"]), None)
+            self.content_types.pop((Bucket, obj["Key"]), None)
+        return {}
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn=3600, HttpMethod=None):
+        query = "&".join(f"{k}={v}" for k, v in sorted(Params.items()) if k not in ("Bucket", "Key"))
+        return f"https://{Params['Bucket']}.s3.local/{Params['Key']}?method={ClientMethod}&{query}"
+
+    def create_multipart_upload(self, Bucket, Key, ContentType=None):
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = {"bucket": Bucket, "key": Key, "content_type": ContentType, "parts": {}}
+        return {"UploadId": upload_id, "Bucket": Bucket, "Key": Key}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        """What the client does with a presigned part URL."""
+        etag = f'"{hashlib.md5(Body).hexdigest()}"'
+        self.uploads[UploadId]["parts"][PartNumber] = (etag, Body)
+        return {"ETag": etag}
+
+    def list_parts(self, Bucket, Key, UploadId, PartNumberMarker=0, MaxParts=1000):
+        numbers = sorted(n for n in self.uploads[UploadId]["parts"] if n > PartNumberMarker)
+        page = numbers[:MaxParts]
+        parts = self.uploads[UploadId]["parts"]
+        response = {
+            "Parts": [{"PartNumber": n, "ETag": parts[n][0], "Size": len(parts[n][1])} for n in page],
+            "IsTruncated": len(numbers) > MaxParts,
+        }
+        if response["IsTruncated"]:
+            response["NextPartNumberMarker"] = page[-1]
+        return response
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        upload = self.uploads.pop(UploadId)
+        body = b""
+        for part in MultipartUpload["Parts"]:
+            etag, data = upload["parts"][part["PartNumber"]]
+            if etag != part["ETag"]:
+                raise ValueError(f"ETag mismatch for part {part['PartNumber']}")
+            body += data
+        self.put_object(Bucket=Bucket, Key=Key, Body=body, ContentType=upload["content_type"])
+        return {"ETag": f'"{hashlib.md5(body).hexdigest()}-{len(MultipartUpload["Parts"])}"'}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
@@ -0,0 +1,33 @@
+import threading
+import time
+
+
+class TranscriptsDisabled(Exception):
+    """Same name as the youtube_transcript_api error, which must not be retried."""
+
+
+class FakeTranscriptSource:
+    """Local stand-in for YouTube: canned transcripts, scripted failures and a concurrency gauge."""
+
+    def __init__(self, latency: float = 0.0, failures=None):
+        self.latency = latency
+        self.failures = dict(failures or {})  # video_id -> exceptions to raise, in order
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, video_id, languages):
+        with self._lock:
+            self.calls.append(video_id)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.latency)
+            pending = self.failures.get(video_id)
+            if pending:
+                raise pending.pop(0)
+            return [{"text": f"Transcript of {video_id}.", "start": 0.0, "duration": 1.0}]
+        finally:
+            with self._lock:
+                self.active -= 1
@@ -0,0 +1,89 @@
+import importlib.util
+import os
+from json import loads
+
+import pytest
+
+from tests.unit.fake_s3 import FakeS3
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "BackendSerice")
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+        self.status_code = 200
+        self.headers = {}
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeServices:
+    """ExtractorService and DBService as BackendService's ``requests.post`` sees them."""
+
+    def __init__(self):
+        self.extracted = []
+        self.rows = []  # (session_id, tag, uri, chunk_id) per stored chunk
+
+    def post(self, url, json=None, data=None, params=None, headers=None, timeout=None):
+        if url.endswith("/process"):
+            self.extracted.extend(json["documents"])
+            chunks = [{"s3_uri": uri, "chunks": [f"text of {uri}"]} for uri in json["documents"]]
+            return FakeResponse({"document_chunks": chunks, "youtube_chunks": [], "errors": [], "unchanged": []})
+        if url.endswith("/store/stream"):
+            records = [loads(line) for line in b"".join(data).splitlines()]
+            self.rows.extend((params["session_id"], params["tag"], r["uri"], r["chunk_id"]) for r in records)
+            return FakeResponse({"stored": len(records), "windows": 1})
+        raise AssertionError(f"unexpected POST {url}")
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setenv("LOG_ASYNC", "0")
+    monkeypatch.setenv("S3_BUCKET_NAME", "bucket")
+    monkeypatch.syspath_prepend(BACKEND_DIR)
+    spec = importlib.util.spec_from_file_location("backend_main", os.path.join(BACKEND_DIR, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    services = FakeServices()
+    s3 = FakeS3()
+    monkeypatch.setattr(module, "s3_client", s3)
+    monkeypatch.setattr(module.requests, "post", services.post)
+    return module, s3, services
+
+
+def test_storing_a_session_twice_stores_each_document_once(backend):
+    main, s3, services = backend
+    s3.put_object(Bucket="bucket", Key="session/a.txt", Body=b"a")
+    s3.put_object(Bucket="bucket", Key="session/b.txt", Body=b"b")
+
+    main.store_documents(main.StoreRequest(session_id="session", tag="notes"))
+    main.store_documents(main.StoreRequest(session_id="session", tag="notes"))
+
+    assert sorted(services.rows) == [
+        ("session", "notes", "s3://bucket/session/a.txt", 0),
+        ("session", "notes", "s3://bucket/session/b.txt", 0),
+    ]
+    assert services.extracted == ["s3://bucket/session/a.txt", "s3://bucket/session/b.txt"]
+
+
+def test_a_changed_document_or_another_tag_is_stored_again(backend):
+    main, s3, services = backend
+    s3.put_object(Bucket="bucket", Key="session/a.txt", Body=b"a")
+    s3.put_object(Bucket="bucket", Key="session/b.txt", Body=b"b")
+    main.store_documents(main.StoreRequest(session_id="session", tag="notes"))
+
+    s3.put_object(Bucket="bucket", Key="session/b.txt", Body=b"b, edited")
+    main.manifest_cache.invalidate("session")  # as the upload endpoints do
+    main.store_documents(main.StoreRequest(session_id="session", tag="notes"))
+    main.store_documents(main.StoreRequest(session_id="session", tag="slides"))
+
+    assert [row[1:3] for row in services.rows[2:]] == [
+        ("notes", "s3://bucket/session/b.txt"),
+        ("slides", "s3://bucket/session/a.txt"),
+        ("slides", "s3://bucket/session/b.txt"),
+    ]
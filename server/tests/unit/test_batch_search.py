@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+from DBService.batch_search import group_results, search_chunks_batch
+from tests.unit.conftest import FakeConnection
+
+
+def hit(idx, session_id, distance):
+    return {"idx": idx, "id": 1, "content": f"{session_id}:{distance}", "chunk_id": 0, "tag": "t",
+            "uri": None, "video_id": None, "session_id": session_id, "distance": distance}
+
+
+def test_group_results_merges_targets_by_distance_per_query():
+    rows = [
+        hit(1, "a", 0.5), hit(1, "a", 0.9), hit(1, "b", 0.1), hit(1, "b", 0.7),
+        hit(2, "a", 0.3),
+    ]
+
+    results = group_results(rows, query_count=3, top_k=3)
+
+    assert [h["distance"] for h in results[0]] == [0.1, 0.5, 0.7]
+    assert [h["session_id"] for h in results[0]] == ["b", "a", "b"]
+    assert [h["distance"] for h in results[1]] == [0.3]
+    assert results[2] == []
+    assert "idx" not in results[0][0]
+
+
+def test_search_chunks_batch_sends_one_statement_with_array_parameters():
+    conn = FakeConnection(rows=[hit(2, "a", 0.2)])
+
+    results = asyncio.run(search_chunks_batch(conn, [[0.1, 0.2], [0.3, 0.4]], [("a", "t"), ("b", "t")], top_k=5))
+
+    assert len(conn.statements) == 1
+    _, (embeddings, sessions, tags, top_k) = conn.statements[0]
+    assert [json.loads(e) for e in embeddings] == [[0.1, 0.2], [0.3, 0.4]]
+    assert (sessions, tags, top_k) == (["a", "b"], ["t", "t"], 5)
+    assert results[0] == [] and results[1][0]["session_id"] == "a"
+
+
+def test_halfvec_storage_prefilters_on_binary_quantization_and_binds_candidates():
+    conn = FakeConnection()
+
+    asyncio.run(search_chunks_batch(conn, [[0.1, 0.2]], [("a", "t")], top_k=5, storage="halfvec", overfetch=8))
+
+    (settings, _), (query, args) = conn.statements
+    assert args[4] == 40
+    assert settings.startswith("SET hnsw.ef_search = 40")
+    assert "binary_quantize(embedding_half)" in query
+    assert "::halfvec(384)" in query
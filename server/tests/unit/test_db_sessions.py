@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from DBService.sessions import SessionNotClaimed, delete_session
+from tests.unit.conftest import FakeConnection
+
+
+def session_with_rows(session_id, rows, claimed=True):
+    conn = FakeConnection()
+    conn.db.sessions[session_id] = {"reaping_at": "2026-01-01" if claimed else None}
+    conn.db.documents = [{"session_id": session_id, "content": f"chunk {i}"} for i in range(rows)]
+    conn.db.documents.append({"session_id": "other", "content": "kept"})
+    return conn
+
+
+def test_delete_session_removes_rows_in_batches_then_the_session():
+    conn = session_with_rows("old", rows=2500)
+
+    deleted = asyncio.run(delete_session(conn, "old", batch_size=1000))
+
+    assert deleted == 2500
+    assert len([query for query, _ in conn.statements if "DELETE FROM documents" in query]) == 3
+    assert "DELETE FROM sessions" in conn.statements[-1][0]
+    assert conn.db.contents() == ["kept"]
+    assert "old" not in conn.db.sessions
+
+
+def test_delete_session_refuses_a_session_that_was_not_claimed():
+    conn = session_with_rows("live", rows=10, claimed=False)
+
+    with pytest.raises(SessionNotClaimed):
+        asyncio.run(delete_session(conn, "live"))
+
+    assert len(conn.db.documents) == 11
+    assert "live" in conn.db.sessions
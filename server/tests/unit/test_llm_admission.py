@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from LLMPromptService.admission import AdmissionController, AdmissionRejected, TokenBucket, estimate_tokens
+
+
+def test_estimate_tokens_counts_prompt_and_completion_budget():
+    assert estimate_tokens("a" * 400, 50) == 150
+    assert estimate_tokens("", None) == 0
+
+
+def test_token_bucket_refills_over_time():
+    now = [0.0]
+    bucket = TokenBucket(60, clock=lambda: now[0])  # one token per second
+    bucket.consume(60)
+    assert bucket.time_until(1) == pytest.approx(1.0)
+    now[0] = 0.5
+    assert bucket.time_until(1) == pytest.approx(0.5)
+    now[0] = 120.0
+    assert bucket.time_until(60) == 0.0
+    assert bucket.time_until(1000) == 0.0  # clamped to capacity
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(0)
+    bucket.consume(10 ** 9)
+    assert bucket.time_until(10 ** 9) == 0.0
+
+
+def test_rejects_early_when_predicted_wait_exceeds_deadline():
+    async def scenario():
+        controller = AdmissionController("test", requests_per_minute=1, tokens_per_minute=0)
+        assert await controller.acquire(10) == 0.0
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(10, deadline=1.0)
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.reason == "deadline"
+    assert rejected.retry_after == pytest.approx(60, abs=1)
+
+
+def test_rejects_when_queue_is_full():
+    async def scenario():
+        controller = AdmissionController("test", requests_per_minute=0, tokens_per_minute=600, max_queue=1)
+        await controller.acquire(600)  # drain the bucket; refills at 10 tokens/s
+        waiting = asyncio.ensure_future(controller.acquire(1, deadline=5))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(1, deadline=5)
+        await waiting
+        return rejected.value
+
+    assert asyncio.run(scenario()).reason == "queue_full"
+
+
+def test_interactive_requests_are_admitted_before_batch():
+    order = []
+
+    async def request(controller, name, priority):
+        await controller.acquire(10, priority=priority, deadline=5)
+        order.append(name)
+
+    async def scenario():
+        controller = AdmissionController("test", requests_per_minute=0, tokens_per_minute=6000)
+        await controller.acquire(6000)  # drain; refills at 100 tokens/s
+        batch = asyncio.ensure_future(request(controller, "batch", "batch"))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(request(controller, "interactive", "interactive"))
+        await asyncio.gather(batch, interactive)
+        return controller
+
+    controller = asyncio.run(scenario())
+    assert order == ["interactive", "batch"]
+    assert controller.depth == 0
+
+
+def test_queued_request_is_rejected_when_overtaken_past_its_deadline():
+    async def scenario():
+        controller = AdmissionController("test", requests_per_minute=0, tokens_per_minute=6000)
+        await controller.acquire(6000)  # drain; refills at 100 tokens/s
+        # Predicted 0.1s fits the deadline when queued...
+        batch = asyncio.ensure_future(controller.acquire(10, priority="batch", deadline=0.2))
+        await asyncio.sleep(0)
+        # ...but a larger interactive request then jumps ahead of it
+        interactive = asyncio.ensure_future(controller.acquire(30, priority="interactive", deadline=5))
+        results = await asyncio.gather(batch, interactive, return_exceptions=True)
+        return controller, results
+
+    controller, (batch, interactive) = asyncio.run(scenario())
+    assert isinstance(batch, AdmissionRejected)
+    assert interactive > 0
+    assert controller.depth == 0
+
+
+def test_predicted_wait_counts_every_refill_for_a_queue_larger_than_the_bucket():
+    now = [0.0]
+
+    async def scenario():
+        controller = AdmissionController("test", requests_per_minute=0, tokens_per_minute=6000,
+                                         clock=lambda: now[0])
+        await controller.acquire(6000)  # drain; refills at 100 tokens/s
+        queued = [asyncio.ensure_future(controller.acquire(1000, deadline=1000)) for _ in range(20)]
+        await asyncio.sleep(0)
+        predicted = controller.predicted_wait(1000, 0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(1000, deadline=100)
+        depth = controller.depth
+        for request in queued:
+            request.cancel()
+        await asyncio.gather(*queued, return_exceptions=True)
+        return predicted, depth, rejected.value
+
+    predicted, depth, rejected = asyncio.run(scenario())
+    assert predicted == pytest.approx(210)  # 21 requests of 1000 tokens at 100 tokens/s
+    assert depth == 20  # rejected before queuing
+    assert rejected.reason == "deadline"
+    assert rejected.retry_after == pytest.approx(210)
+
+
+def test_capacity_taken_for_a_request_that_times_out_is_refunded(monkeypatch):
+    now = [0.0]
+
+    async def scenario():
+        controller = AdmissionController("test", requests_per_minute=60, tokens_per_minute=600,
+                                         clock=lambda: now[0])
+        await controller.acquire(600)  # drain the token bucket; 59 requests left
+        monkeypatch.setattr(controller, "_ensure_pump", lambda: None)
+
+        async def admitted_as_the_deadline_passes(awaitable, timeout):
+            awaitable.cancel()
+            head = controller._queue[0]
+            controller.requests.consume(1)
+            controller.tokens.consume(head.tokens)
+            head.future.set_result(None)
+            raise asyncio.TimeoutError
+
+        monkeypatch.setattr(asyncio, "wait_for", admitted_as_the_deadline_passes)
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire(10, deadline=5)
+        return controller
+
+    controller = asyncio.run(scenario())
+    assert controller.tokens.tokens == pytest.approx(0)
+    assert controller.requests.tokens == pytest.approx(59)
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from LLMPromptService.coalescing import BYPASS, COALESCED, HIT, MISS, RequestCoalescer, TTLCache, request_key
+
+
+def test_request_key_covers_generation_settings():
+    base = request_key("openai", "gpt", "hello", 0.0, 100)
+    assert base == request_key("openai", "gpt", "hello", 0.0, 100)
+    assert base != request_key("openai", "gpt", "hello", 0.0, 200)
+    assert base != request_key("openai", "gpt", "hello", 0.7, 100)
+    assert base != request_key("openai", "gpt-4", "hello", 0.0, 100)
+
+
+def test_ttl_cache_expires_and_evicts():
+    now = [0.0]
+    cache = TTLCache(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    now[0] = 11.0
+    assert cache.get("a") is None
+
+
+def test_concurrent_identical_requests_share_one_call():
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def scenario():
+        coalescer = RequestCoalescer(TTLCache(10, 60))
+        results = await asyncio.gather(*(coalescer.run("k", call) for _ in range(5)))
+        return coalescer, results
+
+    coalescer, results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert [r[0] for r in results] == ["answer"] * 5
+    assert sorted(r[1] for r in results) == [COALESCED] * 4 + [MISS]
+    assert coalescer.in_flight == 0
+
+
+def test_cacheable_results_are_served_from_cache():
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return "answer"
+
+    async def scenario():
+        coalescer = RequestCoalescer(TTLCache(10, 60))
+        first = await coalescer.run("k", call, cacheable=True)
+        second = await coalescer.run("k", call, cacheable=True)
+        bypassed = await coalescer.run("k", call, cacheable=True, use_cache=False)
+        uncached = await coalescer.run("other", call, cacheable=False)
+        again = await coalescer.run("other", call, cacheable=False)
+        return first, second, bypassed, uncached, again
+
+    first, second, bypassed, uncached, again = asyncio.run(scenario())
+
+    assert first == ("answer", MISS)
+    assert second == ("answer", HIT)
+    assert bypassed == ("answer", BYPASS)
+    assert uncached[1] == again[1] == MISS
+    assert len(calls) == 4
+
+
+def test_failures_propagate_to_followers_and_are_not_cached():
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def scenario():
+        coalescer = RequestCoalescer(TTLCache(10, 60))
+        results = await asyncio.gather(*(coalescer.run("k", call, cacheable=True) for _ in range(3)),
+                                       return_exceptions=True)
+        return coalescer, results
+
+    coalescer, results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(coalescer.cache) == 0
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def call():
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def scenario():
+        coalescer = RequestCoalescer(TTLCache(10, 60))
+        leader = asyncio.ensure_future(coalescer.run("k", call, cacheable=True))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(coalescer.run("k", call, cacheable=True))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        result = await follower
+        return coalescer, result
+
+    coalescer, result = asyncio.run(scenario())
+
+    assert result == ("answer", COALESCED)
+    assert len(coalescer.cache) == 1
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import types
+
+import pytest
+
+from LLMPromptService import llm_registry
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """A stand-in ``langchain_openai`` that records every ChatOpenAI it builds."""
+    built = []
+
+    class ChatOpenAI:
+        def __init__(self, **kwargs):
+            self.kwargs = kwargs
+            built.append(self)
+
+    monkeypatch.setitem(sys.modules, "langchain_openai", types.SimpleNamespace(ChatOpenAI=ChatOpenAI))
+    monkeypatch.setattr(llm_registry, "_clients", {})
+    monkeypatch.setattr(llm_registry, "_pooled_http_clients", lambda: ("sync-pool", "async-pool"))
+    monkeypatch.setenv("OPENAI_MODEL", "gpt-test")
+    return built
+
+
+def test_importing_the_registry_loads_no_provider_sdk():
+    code = "import sys, llm_registry; print(sorted(m for m in sys.modules if m.startswith(('langchain', 'httpx'))))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.join(SERVER_DIR, "LLMPromptService"),
+                            capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_client_is_built_once_for_the_configured_model_and_reused(fake_openai):
+    first = llm_registry.get_client("openai")
+    second = llm_registry.get_client("OpenAI")
+
+    assert first is second
+    assert len(fake_openai) == 1
+    assert first.kwargs["model"] == "gpt-test"
+    assert (first.kwargs["http_client"], first.kwargs["http_async_client"]) == ("sync-pool", "async-pool")
+
+
+def test_unknown_provider_is_rejected(fake_openai):
+    with pytest.raises(ValueError):
+        llm_registry.get_client("mystery")
+    assert llm_registry._clients == {}
+
+
+def test_warm_builds_the_configured_provider(fake_openai, monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "openai")
+
+    llm_registry.warm()
+
+    assert llm_registry.get_client() is fake_openai[0]
+    assert len(fake_openai) == 1
+
+
+@pytest.mark.parametrize("provider, expected", [
+    ("openai", {"temperature": 0.2, "max_tokens": 100}),
+    ("deepseek", {"temperature": 0.2, "max_tokens": 100}),
+    ("anthropic", {"temperature": 0.2, "max_tokens_to_sample": 100}),
+    ("google", {"generation_config": {"temperature": 0.2, "max_output_tokens": 100}}),
+])
+def test_generation_kwargs_use_each_providers_parameter_names(provider, expected):
+    assert llm_registry.generation_kwargs(provider, 0.2, 100) == expected
+
+
+def test_generation_kwargs_leave_out_unset_values():
+    assert llm_registry.generation_kwargs("openai", None, 50) == {"max_tokens": 50}
+    assert llm_registry.generation_kwargs("google", None, None) == {}
@@ -0,0 +1,103 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+from common.logging_config import BoundedQueueHandler, ContextFilter, DebugSampler, JsonFormatter, truncate
+from common.observability import _request_id
+
+
+def record(msg="hello %s", args=("world",), level=logging.INFO, name="test", **extra):
+    rec = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    rec.__dict__.update(extra)
+    return rec
+
+
+def test_truncate_bounds_strings_bytes_and_containers():
+    assert str(truncate("short", 10)) == "short"
+    assert str(truncate("x" * 25, 10)) == "x" * 10 + "...(+15 chars)"
+    assert str(truncate(b"abcdef", 3)) == "abc"
+    assert len(str(truncate(list(range(10000)), 50))) <= 50 + len("...(+999 chars)")
+
+
+def test_truncate_is_lazy():
+    class Counted:
+        renders = 0
+
+        def __repr__(self):
+            Counted.renders += 1
+            return "counted"
+
+    logger = logging.getLogger("test_truncate_is_lazy")
+    logger.setLevel(logging.INFO)
+    logger.debug("payload %s", truncate(Counted()))  # filtered out, so never rendered
+    assert Counted.renders == 0
+
+    handler = BoundedQueueHandler(queue.Queue())
+    handler.handle(record("payload %s", (truncate(Counted()),)))
+    assert Counted.renders == 0  # queued, not formatted yet
+
+    formatted = []
+    sink = logging.Handler()
+    sink.setFormatter(JsonFormatter("test"))
+    sink.emit = lambda rec: formatted.append(sink.format(rec))
+    listener = logging.handlers.QueueListener(handler.queue, sink)
+    listener.start()
+    listener.stop()
+
+    assert Counted.renders == 1
+    assert json.loads(formatted[0])["message"] == "payload counted"
+
+
+def test_debug_sampler_keeps_one_in_rate_per_template_and_everything_above_debug():
+    sampler = DebugSampler(rate=3)
+
+    kept = [sampler.filter(record("a %s", (i,), logging.DEBUG)) for i in range(7)]
+    other = [sampler.filter(record("b %s", (i,), logging.DEBUG)) for i in range(2)]
+
+    assert kept == [True, False, False, True, False, False, True]
+    assert other == [True, False]
+    assert all(sampler.filter(record(level=logging.INFO)) for _ in range(5))
+
+
+def test_bounded_queue_handler_drops_and_counts_when_full():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=2))
+
+    for i in range(5):
+        handler.handle(record("msg %s", (i,)))
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_json_formatter_includes_service_request_id_and_extras():
+    rec = record(order_id=42, stage="embed")
+    token = _request_id.set("rid-1")
+    try:
+        ContextFilter().filter(rec)
+    finally:
+        _request_id.reset(token)
+
+    entry = json.loads(JsonFormatter("db").format(rec))
+
+    assert entry["message"] == "hello world"
+    assert entry["service"] == "db"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "test"
+    assert entry["request_id"] == "rid-1"
+    assert (entry["order_id"], entry["stage"]) == (42, "embed")
+    assert "args" not in entry and "msg" not in entry
+
+
+def test_json_formatter_omits_a_missing_request_id_and_renders_exceptions():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        rec = logging.LogRecord("test", logging.ERROR, __file__, 1, "failed", (), sys.exc_info())
+    ContextFilter().filter(rec)
+
+    entry = json.loads(JsonFormatter("db").format(rec))
+
+    assert "request_id" not in entry
+    assert "ValueError: boom" in entry["exc_info"]
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from common import observability
+from common.observability import (
+    MetricsRegistry,
+    ObservabilityMiddleware,
+    format_server_timing,
+    merge_server_timing,
+    outgoing_headers,
+    parse_server_timing,
+    stage,
+)
+
+
+def call(app, headers=()):
+    """Run one GET through ``app``; returns (status, response headers as a dict)."""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": list(headers)}
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    return start["status"], {name.decode(): value.decode() for name, value in start["headers"]}
+
+
+def handler(body):
+    """An ASGI app that runs ``body()`` (inside the request context) and answers 200."""
+    async def app(scope, receive, send):
+        body()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+    return app
+
+
+def test_request_id_is_reused_echoed_and_forwarded():
+    seen = {}
+    app = ObservabilityMiddleware(handler(lambda: seen.update(outgoing_headers())), service="test")
+
+    _, headers = call(app, [(b"x-request-id", b"abc123")])
+
+    assert headers["x-request-id"] == "abc123"
+    assert seen == {"X-Request-ID": "abc123"}
+    assert outgoing_headers() == {}  # reset once the request is done
+
+
+def test_request_id_is_minted_when_missing():
+    _, first = call(ObservabilityMiddleware(handler(lambda: None), service="test"))
+    _, second = call(ObservabilityMiddleware(handler(lambda: None), service="test"))
+
+    assert first["x-request-id"] and first["x-request-id"] != second["x-request-id"]
+
+
+def test_stages_accumulate_into_server_timing():
+    def body():
+        for _ in range(3):
+            with stage("embed"):
+                pass
+        with stage("db_search"):
+            pass
+        merge_server_timing("db", "get_k;dur=12.5, total;dur=20")
+
+    _, headers = call(ObservabilityMiddleware(handler(body), service="test"))
+
+    names = [name for name, _ in parse_server_timing(headers["server-timing"])]
+    assert names == ["embed", "db_search", "db.get_k", "db.total", "total"]
+    assert dict(parse_server_timing(headers["server-timing"]))["db.get_k"] == pytest.approx(0.0125)
+
+
+def test_stage_outside_a_request_only_feeds_the_histogram():
+    before = observability.STAGE_SECONDS.count(service=observability._service_name, stage="offline")
+
+    with stage("offline"):
+        pass
+
+    assert observability.STAGE_SECONDS.count(service=observability._service_name, stage="offline") == before + 1
+
+
+def test_server_timing_sums_repeated_stages_and_round_trips():
+    header = format_server_timing([("embed", 0.010), ("db", 0.0025), ("embed", 0.005)])
+
+    assert header == "embed;dur=15.0, db;dur=2.5"
+    assert parse_server_timing(header) == [("embed", pytest.approx(0.015)), ("db", pytest.approx(0.0025))]
+
+
+def test_parse_server_timing_ignores_unknown_params_and_bad_durations():
+    entries = parse_server_timing('cache;desc="hit", db;dur=abc, , llm;dur=100;desc=x')
+
+    assert entries == [("cache", 0.0), ("db", 0.0), ("llm", 0.1)]
+    assert parse_server_timing(None) == []
+
+
+def test_metrics_render_in_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests_total = registry.counter("reqs", "Requests.", ("code",))
+    depth = registry.gauge("depth", "Queue depth.")
+    latency = registry.histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+    requests_total.inc(code='5"00')
+    requests_total.inc(2, code='5"00')
+    depth.set(3)
+    depth.dec()
+    latency.observe(0.05, stage="db")
+    latency.observe(0.5, stage="db")
+    latency.observe(5, stage="db")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE reqs counter" in lines
+    assert 'reqs_total{code="5\\"00"} 3' in lines
+    assert "depth 2" in lines
+    assert 'latency_seconds_bucket{stage="db",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="db",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{stage="db",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{stage="db"} 5.55' in lines
+    assert 'latency_seconds_count{stage="db"} 3' in lines
+
+
+def test_registering_a_name_twice_returns_the_same_metric_unless_the_kind_differs():
+    registry = MetricsRegistry()
+    counter = registry.counter("hits", "Hits.")
+
+    assert registry.counter("hits", "Hits.") is counter
+    with pytest.raises(ValueError):
+        registry.gauge("hits", "Hits.")
@@ -0,0 +1,107 @@
+import hashlib
+
+from BackendSerice.s3_manifest import SessionManifestCache, StoredObjects, list_session_objects, manifest_metadata
+from tests.unit.fake_s3 import FakeS3
+
+
+def test_list_session_objects_follows_continuation_tokens():
+    s3 = FakeS3()
+    s3.put_object(Bucket="bucket", Key="session/")
+    for i in range(2500):
+        s3.put_object(Bucket="bucket", Key=f"session/doc-{i:04d}.txt", Body=f"doc {i}")
+    s3.put_object(Bucket="bucket", Key="other/doc.txt", Body="x")
+
+    objects = list_session_objects(s3, "bucket", "session")
+
+    assert len(objects) == 2500
+    assert s3.list_calls == 3
+    assert objects[0]["uri"] == "s3://bucket/session/doc-0000.txt"
+    assert objects[0]["size"] == len("doc 0")
+    assert not objects[0]["etag"].startswith('"')
+
+
+def test_manifest_metadata_is_keyed_by_uri():
+    s3 = FakeS3()
+    s3.put_object(Bucket="bucket", Key="session/a.pdf", Body=b"pdf")
+
+    metadata = manifest_metadata(list_session_objects(s3, "bucket", "session"))
+
+    assert metadata == {"s3://bucket/session/a.pdf": {"etag": hashlib.md5(b"pdf").hexdigest(), "size": 3}}
+
+
+def test_cache_lists_once_until_invalidated_or_expired():
+    s3 = FakeS3()
+    s3.put_object(Bucket="bucket", Key="session/a.pdf", Body=b"pdf")
+    now = [0.0]
+    cache = SessionManifestCache(ttl_seconds=60, clock=lambda: now[0])
+    lister = lambda session_id: list_session_objects(s3, "bucket", session_id)
+
+    assert len(cache.get_or_list("session", lister)) == 1
+    s3.put_object(Bucket="bucket", Key="session/b.pdf", Body=b"pdf2")
+    assert len(cache.get_or_list("session", lister)) == 1
+    assert s3.list_calls == 1
+
+    cache.invalidate("session")
+    assert len(cache.get_or_list("session", lister)) == 2
+    assert s3.list_calls == 2
+
+    now[0] = 61.0
+    cache.get_or_list("session", lister)
+    assert s3.list_calls == 3
+
+
+def test_cache_evicts_least_recently_used_session():
+    cache = SessionManifestCache(max_sessions=2)
+    cache.put("a", [])
+    cache.put("b", [])
+    cache.get("a")
+    cache.put("c", [])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == []
+    assert cache.get("c") == []
+
+
+def test_empty_manifest_is_relisted_instead_of_cached():
+    s3 = FakeS3()
+    s3.put_object(Bucket="bucket", Key="session/")
+    cache = SessionManifestCache(ttl_seconds=60)
+    lister = lambda session_id: list_session_objects(s3, "bucket", session_id)
+
+    assert cache.get_or_list("session", lister) == []
+    assert cache.get("session") is None
+
+    # The client's PUT lands after the presigned URL was issued
+    s3.put_object(Bucket="bucket", Key="session/a.pdf", Body=b"pdf")
+    assert len(cache.get_or_list("session", lister)) == 1
+    assert s3.list_calls == 2
+
+
+def test_a_second_store_of_a_session_only_sends_new_or_changed_objects():
+    s3 = FakeS3()
+    s3.put_object(Bucket="bucket", Key="session/a.pdf", Body=b"a")
+    s3.put_object(Bucket="bucket", Key="session/b.pdf", Body=b"b")
+    stored = StoredObjects()
+    sent = []
+
+    def store(tag):
+        # What /store extracts and streams to DBService, marked stored once committed
+        pending = stored.pending("session", tag, list_session_objects(s3, "bucket", "session"))
+        sent.extend(obj["key"] for obj in pending)
+        stored.mark_stored("session", tag, pending)
+
+    store("notes")
+    store("notes")
+    assert sent == ["session/a.pdf", "session/b.pdf"]
+
+    s3.put_object(Bucket="bucket", Key="session/b.pdf", Body=b"b, edited")
+    s3.put_object(Bucket="bucket", Key="session/c.pdf", Body=b"c")
+    store("notes")
+    assert sent[2:] == ["session/b.pdf", "session/c.pdf"]
+
+    store("slides")  # another tag stores its own copy
+    assert sent[4:] == ["session/a.pdf", "session/b.pdf", "session/c.pdf"]
+
+    stored.forget("session")
+    store("notes")
+    assert len(sent) == 10
@@ -0,0 +1,72 @@
+import pytest
+
+from BackendSerice import s3_uploads
+from tests.unit.fake_s3 import FakeS3
+
+MiB = 1024 * 1024
+
+
+def test_content_type_for_supported_files():
+    assert s3_uploads.content_type_for("notes.PDF") == "application/pdf"
+    assert s3_uploads.content_type_for("deck.pptx").endswith("presentationml.presentation")
+    assert s3_uploads.content_type_for("a.txt") == "text/plain"
+    with pytest.raises(ValueError):
+        s3_uploads.content_type_for("image.png")
+
+
+def test_plan_part_size_respects_s3_limits():
+    assert s3_uploads.plan_part_size(1, 1024) == s3_uploads.MIN_PART_SIZE
+    assert s3_uploads.plan_part_size(100 * MiB) == s3_uploads.DEFAULT_PART_SIZE
+    huge = 200 * 1024 * MiB
+    assert huge / s3_uploads.plan_part_size(huge) <= s3_uploads.MAX_PARTS
+
+
+def test_presign_put_uses_file_content_type():
+    url = s3_uploads.presign_put(FakeS3(), "bucket", "session/deck.pptx")
+    assert "ContentType=application/vnd.openxmlformats" in url
+
+
+def test_multipart_upload_round_trip():
+    s3 = FakeS3()
+    data = bytes(range(256)) * (48 * 1024)  # 12 MiB -> 3 parts of 5 MiB
+    upload = s3_uploads.start_multipart_upload(s3, "bucket", "session/big.pdf", len(data), part_size=5 * MiB)
+
+    assert upload["content_type"] == "application/pdf"
+    assert [p["part_number"] for p in upload["parts"]] == [1, 2, 3]
+    assert all("method=upload_part" in p["url"] for p in upload["parts"])
+
+    parts = []
+    for part in reversed(upload["parts"]):  # parts may finish in any order
+        start = (part["part_number"] - 1) * upload["part_size"]
+        response = s3.upload_part(Bucket="bucket", Key="session/big.pdf", UploadId=upload["upload_id"],
+                                  PartNumber=part["part_number"], Body=data[start:start + upload["part_size"]])
+        parts.append({"part_number": part["part_number"], "etag": response["ETag"]})
+
+    result = s3_uploads.complete_multipart_upload(s3, "bucket", "session/big.pdf", upload["upload_id"], parts)
+
+    assert s3.objects[("bucket", "session/big.pdf")] == data
+    assert s3.content_types[("bucket", "session/big.pdf")] == "application/pdf"
+    assert result["etag"].endswith("-3")
+
+
+def test_resume_only_returns_missing_parts():
+    s3 = FakeS3()
+    upload = s3_uploads.start_multipart_upload(s3, "bucket", "session/big.txt", 15 * MiB, part_size=5 * MiB)
+    s3.upload_part(Bucket="bucket", Key="session/big.txt", UploadId=upload["upload_id"], PartNumber=2, Body=b"x")
+
+    resumed = s3_uploads.resume_multipart_upload(s3, "bucket", "session/big.txt", upload["upload_id"], 3)
+
+    assert [p["part_number"] for p in resumed["uploaded"]] == [2]
+    assert [p["part_number"] for p in resumed["parts"]] == [1, 3]
+
+
+def test_abort_discards_upload():
+    s3 = FakeS3()
+    upload = s3_uploads.start_multipart_upload(s3, "bucket", "session/big.pdf", 6 * MiB)
+    s3_uploads.abort_multipart_upload(s3, "bucket", "session/big.pdf", upload["upload_id"])
+    assert upload["upload_id"] not in s3.uploads
+
+
+def test_complete_requires_parts():
+    with pytest.raises(ValueError):
+        s3_uploads.complete_multipart_upload(FakeS3(), "bucket", "session/a.pdf", "id", [])
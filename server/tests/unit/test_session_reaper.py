@@ -0,0 +1,87 @@
+from BackendSerice.session_reaper import delete_session_prefix, reap_expired_sessions
+from tests.unit.fake_s3 import FakeS3
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeDBService:
+    def __init__(self, expired, failing=(), used=()):
+        self.expired = list(expired)
+        self.failing = set(failing)
+        self.used = set(used)  # touched after being listed, so the claim fails
+        self.claimed = []
+        self.deleted = []
+
+    def get(self, url, params=None, headers=None):
+        assert url.endswith("/sessions/expired")
+        return FakeResponse({"session_ids": self.expired[:params["limit"]]})
+
+    def post(self, url, headers=None):
+        assert url.endswith("/claim")
+        session_id = url.rsplit("/", 2)[-2]
+        if session_id in self.used:
+            return FakeResponse({"session_id": session_id, "claimed": False})
+        self.claimed.append(session_id)
+        return FakeResponse({"session_id": session_id, "claimed": True})
+
+    def delete(self, url, headers=None):
+        session_id = url.rsplit("/", 1)[-1]
+        if session_id in self.failing:
+            return FakeResponse({}, status_code=500)
+        self.deleted.append(session_id)
+        return FakeResponse({"session_id": session_id, "deleted_chunks": 3})
+
+
+def test_delete_session_prefix_deletes_in_bounded_batches():
+    s3 = FakeS3()
+    s3.put_object(Bucket="bucket", Key="old/")
+    for i in range(2500):
+        s3.put_object(Bucket="bucket", Key=f"old/doc-{i:04d}.pdf", Body=b"x")
+    s3.put_object(Bucket="bucket", Key="other/doc.pdf", Body=b"x")
+
+    deleted = delete_session_prefix(s3, "bucket", "old")
+
+    assert deleted == 2501
+    assert s3.delete_calls == 3
+    assert list(s3.objects) == [("bucket", "other/doc.pdf")]
+
+
+def test_reaper_deletes_s3_then_rows_and_skips_failures():
+    s3 = FakeS3()
+    for session_id in ("a", "b", "c"):
+        s3.put_object(Bucket="bucket", Key=f"{session_id}/doc.pdf", Body=b"x")
+    db = FakeDBService(expired=["a", "b"], failing=["b"])
+    invalidated = []
+
+    reaped = reap_expired_sessions(s3, "bucket", "http://db", limit=10, on_deleted=invalidated.append, http=db)
+
+    assert reaped == ["a"]
+    assert invalidated == ["a"]
+    assert db.deleted == ["a"]
+    # "b" lost its objects but is still listed as expired, so the next run retries its rows
+    assert ("bucket", "c/doc.pdf") in s3.objects
+
+
+def test_reaper_skips_sessions_used_since_they_were_listed():
+    s3 = FakeS3()
+    for session_id in ("idle", "busy"):
+        s3.put_object(Bucket="bucket", Key=f"{session_id}/doc.pdf", Body=b"x")
+    db = FakeDBService(expired=["idle", "busy"], used=["busy"])
+
+    reaped = reap_expired_sessions(s3, "bucket", "http://db", http=db)
+
+    assert reaped == ["idle"]
+    assert db.claimed == ["idle"]
+    assert db.deleted == ["idle"]
+    assert list(s3.objects) == [("bucket", "busy/doc.pdf")]
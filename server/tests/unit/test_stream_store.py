@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import pytest
+
+from DBService.stream_store import StreamConflict, iter_lines, store_stream
+from tests.unit.conftest import FakeConnection
+
+
+async def fake_embed(texts):
+    return [[float(len(text))] for text in texts]
+
+
+async def body(lines, piece_size=7):
+    data = "".join(json.dumps(line) + "\n" for line in lines).encode()
+    for i in range(0, len(data), piece_size):
+        yield data[i:i + piece_size]
+
+
+def records(count):
+    return [{"uri": "s3://bucket/s/doc.pdf", "chunk_id": i, "text": f"chunk {i}"} for i in range(count)]
+
+
+def run(conn, lines, stream_id="stream", session_id="s", tag="t", window_size=4):
+    return asyncio.run(store_stream(
+        conn, iter_lines(body(lines)), session_id, tag, stream_id, embed=fake_embed, window_size=window_size
+    ))
+
+
+def test_iter_lines_reassembles_lines_split_across_pieces():
+    async def collect():
+        return [line async for line in iter_lines(body(records(3), piece_size=5))]
+
+    lines = asyncio.run(collect())
+
+    assert [json.loads(line)["chunk_id"] for line in lines] == [0, 1, 2]
+
+
+def test_store_stream_writes_fixed_size_windows():
+    conn = FakeConnection()
+
+    summary = run(conn, records(10))
+
+    assert summary == {"stream_id": "stream", "records": 10, "skipped": 0, "stored": 10, "windows": 3}
+    assert conn.inserts == 3
+    assert conn.db.contents() == [f"chunk {i}" for i in range(10)]
+    assert conn.db.streams["stream"]["committed_records"] == 10
+    assert conn.db.streams["stream"]["completed"]
+
+
+def test_retry_resumes_after_the_last_committed_window():
+    conn = FakeConnection(fail_on_insert=2)
+    with pytest.raises(ConnectionError):
+        run(conn, records(10))
+    assert conn.db.streams["stream"]["committed_records"] == 4
+
+    conn.fail_on_insert = None
+    summary = run(conn, records(10))
+
+    assert summary["skipped"] == 4
+    assert summary["stored"] == 6
+    assert conn.db.contents() == [f"chunk {i}" for i in range(10)]
+
+
+def test_stream_id_cannot_be_reused_for_another_session():
+    conn = FakeConnection()
+    run(conn, records(2))
+
+    with pytest.raises(StreamConflict):
+        run(conn, records(2), session_id="other")
+
+
+def test_overlapping_attempts_on_one_stream_store_each_record_once():
+    first = FakeConnection()
+    retry = FakeConnection(first.db)  # a retry sent while the first request is still running
+
+    async def attempt(conn):
+        return await store_stream(conn, iter_lines(body(records(10))), "s", "t", "stream",
+                                  embed=fake_embed, window_size=4)
+
+    async def both():
+        return await asyncio.gather(attempt(first), attempt(retry))
+
+    summaries = asyncio.run(both())
+
+    assert sorted(first.db.contents()) == sorted(f"chunk {i}" for i in range(10))
+    assert sum(summary["stored"] for summary in summaries) == 10
+    assert first.db.streams["stream"]["committed_records"] == 10
@@ -0,0 +1,90 @@
+import asyncio
+
+from common import observability
+from ExtractorService.transcripts import TranscriptCache, TranscriptFetcher, load_source
+from tests.unit.fake_transcripts import FakeTranscriptSource, TranscriptsDisabled
+
+
+async def no_sleep(seconds):
+    pass
+
+
+def fetcher(source, tmp_path, clock=None, **kwargs):
+    cache = TranscriptCache(str(tmp_path), ttl_seconds=60, **({"clock": clock} if clock else {}))
+    return TranscriptFetcher(source, cache, sleep=no_sleep, **kwargs)
+
+
+def test_fetch_many_is_concurrent_but_bounded(tmp_path):
+    source = FakeTranscriptSource(latency=0.05)
+    videos = [f"video{i}" for i in range(8)]
+
+    results = asyncio.run(fetcher(source, tmp_path, max_concurrency=3).fetch_many(videos, ["en"]))
+
+    assert [r["video_id"] for r in results] == videos
+    assert source.max_active == 3
+    assert all(r["segments"][0]["text"] == f"Transcript of {r['video_id']}." for r in results)
+    assert all(r["seconds"] > 0 for r in results)
+
+
+def test_concurrency_limit_is_shared_by_concurrent_calls(tmp_path):
+    source = FakeTranscriptSource(latency=0.05)
+    transcripts = fetcher(source, tmp_path, max_concurrency=3)
+
+    async def two_requests():
+        return await asyncio.gather(
+            transcripts.fetch_many([f"a{i}" for i in range(4)], ["en"]),
+            transcripts.fetch_many([f"b{i}" for i in range(4)], ["en"]),
+        )
+
+    first, second = asyncio.run(two_requests())
+
+    assert source.max_active == 3
+    assert len(first) == len(second) == 4
+
+
+def test_server_timing_reports_the_batch_once_not_the_sum_of_fetches(tmp_path):
+    source = FakeTranscriptSource(latency=0.05)
+
+    async def request():
+        timings = []
+        observability._timings.set(timings)
+        await fetcher(source, tmp_path, max_concurrency=4).fetch_many([f"v{i}" for i in range(4)], ["en"])
+        return timings
+
+    timings = asyncio.run(request())
+
+    assert [name for name, _ in timings] == ["youtube_transcript"]
+    assert timings[0][1] < 4 * 0.05
+
+
+def test_transient_errors_are_retried_and_permanent_ones_are_not(tmp_path):
+    source = FakeTranscriptSource(failures={
+        "flaky": [ConnectionError("reset"), ConnectionError("reset")],
+        "disabled": [TranscriptsDisabled("disabled")],
+    })
+
+    flaky, disabled = asyncio.run(fetcher(source, tmp_path, retries=3).fetch_many(["flaky", "disabled"], ["en"]))
+
+    assert flaky["attempts"] == 3 and "segments" in flaky
+    assert disabled["attempts"] == 1 and disabled["error"] == "disabled"
+
+
+def test_cache_serves_transcripts_until_the_ttl_expires(tmp_path):
+    now = [1000.0]
+    source = FakeTranscriptSource()
+    transcripts = fetcher(source, tmp_path, clock=lambda: now[0])
+
+    asyncio.run(transcripts.fetch_many(["abc"], ["en"]))
+    cached = asyncio.run(transcripts.fetch_many(["abc"], ["en"]))[0]
+    other_language = asyncio.run(transcripts.fetch_many(["abc"], ["de"]))[0]
+    now[0] += 61
+    expired = asyncio.run(transcripts.fetch_many(["abc"], ["en"]))[0]
+
+    assert cached["cached"] and cached["attempts"] == 0
+    assert not other_language["cached"]
+    assert not expired["cached"]
+    assert source.calls == ["abc", "abc", "abc"]
+
+
+def test_load_source_imports_a_module_attribute():
+    assert isinstance(load_source("tests.unit.fake_transcripts:FakeTranscriptSource"), FakeTranscriptSource)
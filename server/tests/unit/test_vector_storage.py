@@ -0,0 +1,21 @@
+import pytest
+
+from DBService.vector_storage import candidate_count, nearest_sql, storage_mode
+
+
+def test_storage_mode_rejects_unknown_modes():
+    assert storage_mode("halfvec") == "halfvec"
+    with pytest.raises(ValueError):
+        storage_mode("int8")
+
+
+def test_candidate_count_never_fetches_fewer_than_top_k():
+    assert candidate_count(5, 10) == 50
+    assert candidate_count(5, 0) == 5
+
+
+def test_vector_mode_searches_exactly_without_a_candidate_parameter():
+    sql = nearest_sql("vector", where="session_id = $2", query="$3::vector(384)", limit="$4", candidates="$5")
+
+    assert "$5" not in sql
+    assert "ORDER BY embedding <-> $3::vector(384)" in sql